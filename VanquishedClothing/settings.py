@@ -51,13 +51,53 @@ CLOUDINARY_STORAGE = {
 CELERY_BROKER_URL = "redis://localhost:6379/0" 
 CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
 
+# Shared cache: version counters, the suggestion index and cart badges must be seen
+# by every web and Celery worker, so this is the Redis Celery already needs, not per-process memory
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_URL", "redis://localhost:6379/1"),
+    }
+}
+
+SUGGESTION_INDEX_MAX_PRODUCTS = int(os.getenv("SUGGESTION_INDEX_MAX_PRODUCTS", "5000"))
+FACET_CACHE_TIMEOUT = 300
+PRODUCT_FRAGMENT_TIMEOUT = 600
+
+# Checkout stock holds: the database backend, or the Redis one with native TTLs
+RESERVATION_BACKEND = os.getenv("RESERVATION_BACKEND", "store.reservations.DatabaseReservationBackend")
+RESERVATION_REDIS_URL = os.getenv("RESERVATION_REDIS_URL", CELERY_BROKER_URL)
+RESERVATION_TTL = 5 * 60
+
+# product image uploads wait here for the Celery worker (store.images); shared by web and worker
+IMAGE_STAGING_ROOT = os.getenv("IMAGE_STAGING_ROOT", str(BASE_DIR / "staging"))
+
 CELERY_BEAT_SCHEDULE = {
     "release-expired-reservations": {
         "task": "store.tasks.release_expired_reservations",
         "schedule": crontab(minute="*"),
     },
+    "refresh-related-products": {
+        "task": "store.tasks.refresh_related_products_task",
+        "schedule": crontab(minute=30, hour=3),
+    },
+    "apply-discount-transitions": {
+        "task": "store.tasks.apply_discount_transitions",
+        "schedule": crontab(minute="*"),
+    },
+    # catches anything the webhook's own nudge missed, e.g. retries after a failure
+    "process-webhook-events": {
+        "task": "orders.tasks.process_webhook_events",
+        "schedule": crontab(minute="*"),
+    },
+    "drain-storage-deletions": {
+        "task": "store.tasks.drain_storage_deletions",
+        "schedule": crontab(minute="*"),
+    },
 }
 
+RELATED_PRODUCTS_STORED = 30
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -3,14 +3,17 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from .models import Review
-from store.models import Product
+from store.cache import bump_version
+from store.facets import FACETS_VERSION
+from store.models import Product, apply_rating_change
 from .forms import UserFieldUpdateForm, AddressForm, LoginForm, RegisterForm, ReviewForm
-from django.core.paginator import Paginator
+from store.pagination import CursorPaginator
 from .utils import send_activation_email
 from django.utils.http import urlsafe_base64_decode
 from .tokens import account_activation_token
 from django.views.decorators.http import require_POST
 from django.contrib import messages
+from django.db import transaction
 from django.http import HttpResponseForbidden
 from django.urls import reverse
 
@@ -114,10 +117,8 @@ def account_dashboard(request):
                 return redirect("account_dashboard")
 
     # ORDERS WITH PAGINATION
-    orders_qs = user.orders.prefetch_related("items__variant__product").order_by("-created_at")
-    paginator = Paginator(orders_qs, 10)  # 10 orders per page
-    page_number = request.GET.get("page")
-    orders_page = paginator.get_page(page_number)
+    orders_qs = user.orders.order_by("-created_at")
+    orders_page = CursorPaginator(orders_qs, 10).get_page(request.GET.get("cursor"))  # 10 orders per page
 
     addresses = user.addresses.all()
 
@@ -150,7 +151,10 @@ def add_review(request, product_id):
         review = form.save(commit=False)
         review.product = product
         review.user = request.user
-        review.save()
+        with transaction.atomic():
+            review.save()
+            apply_rating_change(product.id, added=review.rating)
+        bump_version(FACETS_VERSION)
         messages.success(request, "Your review has been posted.")
     else:
         messages.error(request, "Please choose a rating and write a comment.")
@@ -160,15 +164,21 @@ def add_review(request, product_id):
 
 @login_required
 @require_POST
+@transaction.atomic
 def edit_review(request, review_id):
-    review = get_object_or_404(Review, id=review_id)
+    # locked so a concurrent edit can't apply its delta against a stale rating
+    review = get_object_or_404(Review.objects.select_for_update(), id=review_id)
 
     if not _can_modify(request.user, review):
         return HttpResponseForbidden("You can't edit this review.")
 
+    old_rating = review.rating
     form = ReviewForm(request.POST, instance=review)
     if form.is_valid():
         form.save()
+        if review.rating != old_rating:
+            apply_rating_change(review.product_id, added=review.rating, removed=old_rating)
+            bump_version(FACETS_VERSION)
         messages.success(request, "Your review has been updated.")
 
     return redirect(f"{reverse('product', args=[review.product_id])}#reviews")
@@ -176,13 +186,16 @@ def edit_review(request, review_id):
 
 @login_required
 @require_POST
+@transaction.atomic
 def delete_review(request, review_id):
-    review = get_object_or_404(Review, id=review_id)
+    review = get_object_or_404(Review.objects.select_for_update(), id=review_id)
 
     if not _can_modify(request.user, review):
         return HttpResponseForbidden("You can't delete this review.")
 
     product_id = review.product_id
     review.delete()
+    apply_rating_change(product_id, removed=review.rating)
+    bump_version(FACETS_VERSION)
     messages.success(request, "Review deleted.")
     return redirect(f"{reverse('product', args=[product_id])}#reviews")
\ No newline at end of file
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import CartItem
+
+CART_COUNT_KEY = "orders:cart_count:{}"
+
+
+def _cart_count_key(user_id=None, session_key=None):
+    if user_id:
+        return CART_COUNT_KEY.format(f"user:{user_id}")
+    if session_key:
+        return CART_COUNT_KEY.format(f"session:{session_key}")
+    return None
+
+
+def load_cart_count(user_id=None, session_key=None):
+    # read-only; a visitor without a cart row just counts as 0
+    if user_id:
+        items = CartItem.objects.filter(cart__user_id=user_id)
+    else:
+        items = CartItem.objects.filter(cart__session_key=session_key)
+    count = items.aggregate(total=Sum("quantity"))["total"] or 0
+    cache.set(_cart_count_key(user_id, session_key), count, settings.SESSION_COOKIE_AGE)
+    return count
+
+
+def get_cart_count(request):
+    # never creates a session: visitors without one have no cart
+    if request.user.is_authenticated:
+        owner = {"user_id": request.user.pk}
+    elif request.session.session_key:
+        owner = {"session_key": request.session.session_key}
+    else:
+        return 0
+
+    count = cache.get(_cart_count_key(**owner))
+    if count is None:
+        count = load_cart_count(**owner)
+    return count
+
+
+def refresh_cart_count(cart):
+    # after commit, so a rolled-back checkout doesn't clear the badge
+    user_id = cart.user_id
+    session_key = None if user_id else cart.session_key
+    transaction.on_commit(lambda: load_cart_count(user_id, session_key))
@@ -1,11 +1,4 @@
-from .views import get_or_create_cart
-from django.db.models import Sum
+from .cart import get_cart_count
 
 def cart_count(request):
-    try:
-        cart = get_or_create_cart(request)
-        count = cart.items.aggregate(total=Sum("quantity"))["total"] or 0
-    except:
-        count = 0
-
-    return {"cart_count": count}
\ No newline at end of file
+    return {"cart_count": get_cart_count(request)}
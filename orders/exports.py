@@ -0,0 +1,25 @@
+from store.exports import created_between
+
+from .models import OrderItem
+
+
+def order_export(status=None, since=None, until=None):
+    # one row per order line, order fields repeated
+    columns = [
+        "order_id", "created_at", "status", "payment_method", "user_id", "full_name", "email", "phone",
+        "street", "city", "postal_code", "country", "subtotal", "delivery_fee", "cod_fee", "total",
+        "item_id", "variant_id", "product", "size", "quantity", "price", "return_requested",
+    ]
+    items = OrderItem.objects.filter(**created_between(since, until, "order__created_at"))
+    if status:
+        items = items.filter(order__status=status)
+
+    rows = items.order_by("order_id", "id").values_list(
+        "order_id", "order__created_at", "order__status", "order__payment_method", "order__user_id",
+        "order__full_name", "order__email", "order__phone", "order__street", "order__city",
+        "order__postal_code", "order__country", "order__subtotal", "order__delivery_fee",
+        "order__cod_fee", "order__total",
+        "id", "variant_id", "variant__product__name", "variant__size", "quantity", "price_snapshot",
+        "return_requested",
+    )
+    return columns, rows
@@ -0,0 +1,51 @@
+# Generated by Django 6.0.3 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+def backfill_item_summary(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+
+    orders = Order.objects.order_by("id").only("id")
+    for start in range(0, orders.count(), 500):
+        batch = list(orders[start:start + 500])
+        lines = {}
+        for item in OrderItem.objects.filter(order__in=batch).select_related("variant__product").order_by("id"):
+            lines.setdefault(item.order_id, []).append(item)
+
+        for order in batch:
+            items = lines.get(order.id, [])
+            order.item_count = sum(item.quantity for item in items)
+            order.item_summary = [
+                {
+                    "variant_id": item.variant_id,
+                    "name": item.variant.product.name,
+                    "size": item.variant.size,
+                    "quantity": item.quantity,
+                    "price": str(item.price_snapshot),
+                    "total": str(item.quantity * item.price_snapshot),
+                } for item in items
+            ]
+        Order.objects.bulk_update(batch, ["item_count", "item_summary"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_webhook_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='item_summary',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(backfill_item_summary, migrations.RunPython.noop),
+    ]
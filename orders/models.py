@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.conf import settings
 from store.models import ProductVariant
 
@@ -48,8 +49,43 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     comment = models.TextField(blank=True)
 
+    # written with the items, so order lists render without joining them
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    item_summary = models.JSONField(default=list, editable=False)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # admin queue and account dashboard keyset pagination
+            models.Index(fields=["status", "created_at", "id"]),
+            models.Index(fields=["user", "created_at", "id"]),
+        ]
+
+    def add_items(self, items):
+        # cart items -> order lines at their current price, in one insert
+        order_items = OrderItem.objects.bulk_create([
+            OrderItem(
+                order=self,
+                variant=item.variant,
+                quantity=item.quantity,
+                price_snapshot=item.price,
+            ) for item in items
+        ])
+        self.summarize(order_items)
+        self.save(update_fields=["item_count", "item_summary"])
+
+    def summarize(self, order_items):
+        self.item_count = sum(item.quantity for item in order_items)
+        self.item_summary = [
+            {
+                "variant_id": item.variant_id,
+                "name": item.variant.product.name,
+                "size": item.variant.size,
+                "quantity": item.quantity,
+                "price": str(item.price_snapshot),
+                "total": str(item.total_price),
+            } for item in order_items
+        ]
 
 
 class OrderItem(models.Model):
@@ -94,6 +130,12 @@ class Cart(models.Model):
         return sum(item.total_price for item in self.items.all())
 
 
+class CartItemQuerySet(models.QuerySet):
+    def with_prices(self):
+        # the same stored price the listings filter and sort on
+        return self.annotate(unit_price=F("variant__product__current_price"))
+
+
 class CartItem(models.Model):
     cart = models.ForeignKey(
         Cart,
@@ -106,9 +148,45 @@ class CartItem(models.Model):
     )
     quantity = models.PositiveIntegerField(default=1)
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         unique_together = ("cart", "variant")
 
+    @property
+    def price(self):
+        # the with_prices() annotation when present, so totals don't redo the discount logic per row
+        if "unit_price" in self.__dict__:
+            return self.unit_price
+        return self.variant.product.final_price
+
     @property
     def total_price(self):
-        return self.variant.product.final_price * self.quantity
\ No newline at end of file
+        return self.price * self.quantity
+
+class WebhookEvent(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processed", "Processed"),
+        ("ignored", "Ignored"),
+        ("failed", "Failed"),
+    ]
+
+    # Stripe's evt_... id; retries of the same delivery land on the same row
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    outcome = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["received_at"]
+        indexes = [models.Index(fields=["status", "received_at"])]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
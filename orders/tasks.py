@@ -0,0 +1,6 @@
+from celery import shared_task
+from .webhooks import process_pending_events
+
+@shared_task
+def process_webhook_events():
+    return process_pending_events()
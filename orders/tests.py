@@ -1,3 +1,42 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from store.models import Product, ProductVariant
+
+from .models import Order
+
+CHECKOUT = {
+    "payment_method": "cod",
+    "first_name": "Anna",
+    "last_name": "Berry",
+    "phone": "+359888123456",
+    "email": "anna@example.com",
+    "city": "Sofia",
+    "postal_code": "1000",
+    "street": "Main 1",
+    "country": "BG",
+}
+
+
+class CashOnDeliveryCheckoutTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Tee", slug="tee", price="20.00", status="active")
+        self.variant = ProductVariant.objects.create(product=self.product, size="M", stock=2)
+        self.client.post(reverse("product", args=[self.product.id]), {"variant": self.variant.id})
+
+    def test_order_takes_the_stock(self):
+        self.client.post(reverse("checkout"), CHECKOUT)
+
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 1)
+        self.assertEqual(Order.objects.get().items.count(), 1)
+
+    def test_short_line_rolls_the_order_back(self):
+        ProductVariant.objects.filter(pk=self.variant.pk).update(stock=0)
+
+        response = self.client.post(reverse("checkout"), CHECKOUT)
+
+        self.assertRedirects(response, reverse("cart"), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 0)
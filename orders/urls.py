@@ -7,5 +7,6 @@ urlpatterns = [
     path("checkout/", views.checkout, name="checkout"),
     path("checkout-success/", views.checkout_success_page, name="checkout_success_page"),
     path("admin/orders/", views.admin_orders, name="admin_orders"),
+    path("admin/orders/export/", views.export_orders, name="export_orders"),
     path("stripe-webhook/", views.stripe_webhook, name="stripe_webhook")
 ]
\ No newline at end of file
@@ -1,33 +1,80 @@
 from django.urls import reverse
 from django.views.decorators.http import require_POST
-from django.shortcuts import get_object_or_404, render, redirect
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
-from django.utils import timezone
+from django.db.models import Prefetch
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
-from django.core.paginator import Paginator
+from store.pagination import CursorPaginator
 from decimal import Decimal
-from datetime import timedelta
+import json
 import stripe
 from django.contrib import messages
 from .models import CartItem, Cart, Order, OrderItem
-from store.models import ProductVariant, ProductVariantReservation
+from .cart import refresh_cart_count
+from .tasks import process_webhook_events
+from .webhooks import store_event
+from .exports import order_export
+from store.exports import FORMATS, streaming_export
+from store.models import ProductImage, ProductVariant
+from store.reservations import get_reservation_backend, load_availability, reservation_owner
+from store.stock import commit_stock, commit_stock_batches, order_lines
 from accounts.forms import AddressForm
 from .forms import CustomerForm
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
-from django.contrib.auth import get_user_model
-from django.db.models import Q
-
-User = get_user_model()
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
-RESERVATION_MINUTES = 5
 COD_PERCENT = Decimal("0.03")
 
 
+# ---------------------------
+# ORDER HELPERS
+# ---------------------------
+def _report_short(request, short):
+    for variant in ProductVariant.objects.filter(id__in=short).select_related("product"):
+        messages.error(request, f"Not enough stock for {variant} ({short[variant.id]} left)")
+
+
+def _moderate_orders(request, action, order_ids, comment=""):
+    with transaction.atomic():
+        # oldest first, so stock goes to whoever ordered first
+        orders = list(
+            Order.objects.select_for_update()
+            .filter(id__in=order_ids, status="pending")
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+        )
+        if not orders:
+            return
+
+        if action == "deny":
+            Order.objects.filter(id__in=orders).update(status="denied", comment=comment)
+            messages.success(request, f"Denied {len(orders)} order(s)")
+            return
+
+        batches = {order_id: {} for order_id in orders}
+        for order_id, variant_id, quantity in OrderItem.objects.filter(order_id__in=orders).values_list(
+            "order_id", "variant_id", "quantity"
+        ):
+            batches[order_id][variant_id] = batches[order_id].get(variant_id, 0) + quantity
+
+        accepted, short = commit_stock_batches(batches)
+        Order.objects.filter(id__in=accepted).update(status="accepted")
+
+    if accepted:
+        messages.success(request, f"Accepted {len(accepted)} order(s)")
+    if short:
+        variants = ProductVariant.objects.select_related("product").in_bulk(
+            {variant_id for lines in short.values() for variant_id in lines}
+        )
+        for order_id, lines in short.items():
+            missing = ", ".join(f"{variants[variant_id]} ({left} left)" for variant_id, left in lines.items())
+            messages.error(request, f"Order #{order_id} not accepted, not enough stock for {missing}")
+
+
 # ---------------------------
 # CART HELPERS
 # ---------------------------
@@ -52,7 +99,9 @@ def get_or_create_cart(request=None, user=None):
 # ---------------------------
 def cart_view(request):
     cart = get_or_create_cart(request)
-    items = cart.items.select_related("variant__product")
+    items = cart.items.with_prices().select_related("variant__product").prefetch_related(
+        Prefetch("variant__product__images", queryset=ProductImage.objects.ready().order_by("order"))
+    )
 
     subtotal = sum((item.total_price for item in items), Decimal("0.00"))
     delivery_fee = Decimal("5.00") if 0 < subtotal < 100 else Decimal("0.00")
@@ -89,6 +138,7 @@ def update_cart_item(request, item_id):
         item.delete()
     else:
         item.save()
+    refresh_cart_count(cart)
 
     return redirect("cart")
 
@@ -98,7 +148,7 @@ def update_cart_item(request, item_id):
 # ---------------------------
 def checkout(request):
     cart = get_or_create_cart(request)
-    items = cart.items.select_related("variant__product")
+    items = cart.items.with_prices().select_related("variant__product")
 
     subtotal = sum((item.total_price for item in items), Decimal("0.00"))
     delivery_fee = Decimal("5.00") if 0 < subtotal < 100 else Decimal("0.00")
@@ -202,26 +252,16 @@ def checkout(request):
         # CARD (STRIPE)
         # ---------------------------
         if payment_method == "card":
-            with transaction.atomic():
-                for item in items.select_for_update():
-                    variant = item.variant
-                    if variant.available_quantity() < item.quantity:
-                        return redirect("cart")
-
-                    ProductVariantReservation.objects.create(
-                        variant=variant,
-                        user=user if user else None,
-                        session_key=session_key if not user else None,
-                        quantity=item.quantity,
-                        reserved_until=timezone.now() + timedelta(minutes=RESERVATION_MINUTES)
-                    )
+            owner = reservation_owner(user, session_key)
+            if not get_reservation_backend().reserve(owner, {item.variant_id: item.quantity for item in items}):
+                return redirect("cart")
 
             line_items = [
                 {
                     "price_data": {
                         "currency": "eur",
                         "product_data": {"name": f"{item.variant.product.name} - {item.variant.size}"},
-                        "unit_amount": int(item.variant.product.final_price * 100),
+                        "unit_amount": int(item.price * 100),
                     },
                     "quantity": item.quantity,
                 } for item in items
@@ -266,13 +306,13 @@ def checkout(request):
         # COD
         # ---------------------------
         else:
+            owner = reservation_owner(user, session_key)
             with transaction.atomic():
-                for item in items.select_for_update():
-                    variant = item.variant
-                    if variant.available_quantity() < item.quantity:
-                        return redirect("cart")
-                    variant.stock -= item.quantity
-                    variant.save()
+                # holds from an abandoned card checkout are the buyer's own stock
+                result = commit_stock(order_lines(items), owner=owner)
+                if result.short:
+                    _report_short(request, result.short)
+                    return redirect("cart")
 
                 order = Order.objects.create(
                     user=user,
@@ -291,15 +331,11 @@ def checkout(request):
                     status="pending"
                 )
 
-                for item in items:
-                    OrderItem.objects.create(
-                        order=order,
-                        variant=item.variant,
-                        quantity=item.quantity,
-                        price_snapshot=item.variant.product.final_price
-                    )
+                order.add_items(items)
 
                 cart.items.all().delete()
+                refresh_cart_count(cart)
+                transaction.on_commit(lambda: get_reservation_backend().release(owner))
                 return redirect("checkout_success_page")
 
     # ---------------------------
@@ -333,82 +369,16 @@ def stripe_webhook(request):
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
 
     try:
-        event = stripe.Webhook.construct_event(
+        # only verifies; the inbox stores the plain JSON, not stripe's Event object
+        stripe.Webhook.construct_event(
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
     except Exception:
         return HttpResponse(status=400)
 
-    if event["type"] == "checkout.session.completed":
-        session = event["data"]["object"]
-        metadata = session.get("metadata", {})
-
-        user_id = metadata.get("user_id") or None
-        session_key = metadata.get("session_key") or None
-
-        user = User.objects.filter(id=user_id).first() if user_id else None
-
-        if user:
-            cart = Cart.objects.filter(user=user).first()
-        else:
-            cart = Cart.objects.filter(session_key=session_key).first()
-
-        if not cart:
-            return HttpResponse(status=200)
-
-        items = cart.items.select_related("variant__product")
-
-        with transaction.atomic():
-            subtotal = Decimal("0.00")
-
-            for item in items.select_for_update():
-                variant = item.variant
-
-                reservation = ProductVariantReservation.objects.filter(
-                    variant=variant,
-                    reserved_until__gt=timezone.now()
-                ).filter(
-                    Q(user=user) | Q(session_key=session_key)
-                ).first()
-
-                if not reservation or reservation.quantity < item.quantity:
-                    continue
-
-                variant.stock -= item.quantity
-                variant.save()
-
-                reservation.delete()
-                subtotal += item.total_price
-
-            order = Order.objects.create(
-                user=user,
-                full_name=f"{metadata.get('first_name','')} {metadata.get('last_name','')}".strip(),
-                phone=metadata.get("phone"),
-                email=metadata.get("email") or "", 
-                street=metadata.get("street"),
-                city=metadata.get("city"),
-                postal_code=metadata.get("postal_code"),
-                country=metadata.get("country"),
-                subtotal=subtotal,
-                delivery_fee=Decimal(metadata.get("delivery_fee", "0.00")),
-                total=Decimal(session["amount_total"]) / 100,
-                payment_method="card",
-                status="accepted"
-            )
-
-            for item in items:
-                OrderItem.objects.create(
-                    order=order,
-                    variant=item.variant,
-                    quantity=item.quantity,
-                    price_snapshot=item.variant.product.final_price
-                )
-
-            ProductVariantReservation.objects.filter(
-                Q(user=user) | Q(session_key=session_key)
-            ).delete()
-
-            cart.items.all().delete()
+    # the signature covers the raw body, so that's what goes in the inbox
+    if store_event(json.loads(payload)):
+        transaction.on_commit(lambda: process_webhook_events.delay())
 
     return HttpResponse(status=200)
 
@@ -421,38 +391,17 @@ def checkout_success_page(request):
 @staff_member_required 
 def admin_orders(request):
     if request.method == "POST":
+        # the per-order buttons send order_id, the bulk bar sends order_ids
+        order_ids = request.POST.getlist("order_ids") or [request.POST.get("order_id")]
+        order_ids = [order_id for order_id in order_ids if order_id and order_id.isdigit()]
         action = request.POST.get("action")
-        order_id = request.POST.get("order_id")
-        order = get_object_or_404(Order, id=order_id)
-
-        if order.status != "pending":
-            return redirect("admin_orders")
-
-        if action == "accept":
-            with transaction.atomic():
-                for item in order.items.select_related("variant"):
-                    variant = ProductVariant.objects.select_for_update().get(id=item.variant.id)
-
-                    if variant.available_quantity() < item.quantity:
-                        messages.error(request, f"Not enough stock for {variant}")
-                        return redirect("admin_orders")
-
-                    variant.stock -= item.quantity
-                    variant.save()
-
-                order.status = "accepted"
-                order.save()
-
-        elif action == "deny":
-            order.status = "denied"
-            order.comment = request.POST.get("comment", "")
-            order.save()
-
+        if action in ("accept", "deny") and order_ids:
+            _moderate_orders(request, action, order_ids, request.POST.get("comment", ""))
         return redirect("admin_orders")
 
     status_filter = request.GET.get("status", "pending")
 
-    orders = Order.objects.prefetch_related("items__variant__product")
+    orders = Order.objects.all()
 
     if status_filter == "accepted":
         orders = orders.filter(status="accepted").order_by("-created_at")
@@ -461,11 +410,30 @@ def admin_orders(request):
     else:
         orders = orders.filter(status="pending").order_by("created_at")
 
-    paginator = Paginator(orders, 20)
-    page_obj = paginator.get_page(request.GET.get("page"))
+    page_obj = CursorPaginator(orders, 20).get_page(request.GET.get("cursor"))
+
+    # live stock next to each line, in one query for the whole page
+    lines = [line for order in page_obj for line in order.item_summary]
+    variants = load_availability(
+        ProductVariant.objects.filter(id__in={line["variant_id"] for line in lines}).only("id", "stock")
+    )
+    stock = {variant.id: (variant.stock, variant.available) for variant in variants}
+    for line in lines:
+        line["stock"], line["available"] = stock.get(line["variant_id"], (0, 0))
 
     return render(request, "store/admin_orders.html", {
         "orders": page_obj,
         "page_obj": page_obj,
         "status_filter": status_filter,
-    })
\ No newline at end of file
+    })
+
+
+@staff_member_required
+def export_orders(request):
+    fmt = request.GET.get("format") if request.GET.get("format") in FORMATS else "csv"
+    return streaming_export(
+        "orders", order_export, fmt,
+        status=request.GET.get("status") or None,
+        since=request.GET.get("since"),
+        until=request.GET.get("until"),
+    )
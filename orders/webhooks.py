@@ -0,0 +1,145 @@
+import logging
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from store.reservations import get_reservation_backend, reservation_owner
+from store.stock import order_lines
+
+from .cart import refresh_cart_count
+from .models import Cart, Order, WebhookEvent
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+
+logger = logging.getLogger(__name__)
+
+
+def store_event(event):
+    # Stripe redelivers until it gets a 2xx; a repeat id is already in the inbox
+    _, created = WebhookEvent.objects.get_or_create(
+        event_id=event["id"],
+        defaults={"type": event["type"], "payload": event},
+    )
+    return created
+
+
+# ---------------------------
+# HANDLERS
+# ---------------------------
+# each returns (status, outcome) for the inbox row
+def checkout_session_completed(payload):
+    session = payload["data"]["object"]
+    metadata = session.get("metadata") or {}
+
+    user_id = metadata.get("user_id") or None
+    session_key = metadata.get("session_key") or None
+    user = get_user_model().objects.filter(id=user_id).first() if user_id else None
+
+    if user:
+        cart = Cart.objects.filter(user=user).first()
+    else:
+        cart = Cart.objects.filter(session_key=session_key).first()
+
+    if not cart:
+        return "ignored", "no cart"
+
+    items = list(cart.items.with_prices().select_related("variant__product"))
+    confirmed = get_reservation_backend().confirm(reservation_owner(user, session_key), order_lines(items))
+    subtotal = sum(
+        (item.total_price for item in items if item.variant_id in confirmed), Decimal("0.00")
+    )
+    # paid for but no longer held: kept on the order for staff to resolve
+    short = [item for item in items if item.variant_id not in confirmed]
+
+    order = Order.objects.create(
+        user=user,
+        full_name=f"{metadata.get('first_name','')} {metadata.get('last_name','')}".strip(),
+        phone=metadata.get("phone"),
+        email=metadata.get("email") or "",
+        street=metadata.get("street"),
+        city=metadata.get("city"),
+        postal_code=metadata.get("postal_code"),
+        country=metadata.get("country"),
+        subtotal=subtotal,
+        delivery_fee=Decimal(metadata.get("delivery_fee") or "0.00"),
+        total=Decimal(session["amount_total"]) / 100,
+        payment_method="card",
+        status="accepted",
+        comment="Out of stock: " + ", ".join(str(item.variant) for item in short) if short else "",
+    )
+    order.add_items(items)
+
+    cart.items.all().delete()
+    refresh_cart_count(cart)
+    return "processed", f"order {order.id}"
+
+
+HANDLERS = {
+    "checkout.session.completed": checkout_session_completed,
+}
+
+
+# ---------------------------
+# PROCESSING
+# ---------------------------
+def process_event(event):
+    handler = HANDLERS.get(event.type)
+    if handler is None:
+        return "ignored", "unhandled type"
+    return handler(event.payload)
+
+
+def _process_claimed(event_id):
+    # One transaction per event, so the variant locks its stock commit takes are
+    # released as soon as that event is done. The savepoint inside keeps the
+    # attempt count when the handler fails.
+    with transaction.atomic():
+        event = (
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(id=event_id, status="pending")
+            .first()
+        )
+        if event is None:
+            return False
+
+        event.attempts += 1
+        try:
+            with transaction.atomic():
+                event.status, event.outcome = process_event(event)
+        except Exception as exc:
+            logger.exception("Webhook event %s failed", event.event_id)
+            event.outcome = repr(exc)
+            if event.attempts >= MAX_ATTEMPTS:
+                event.status = "failed"
+        event.processed_at = timezone.now()
+        event.save(update_fields=["status", "outcome", "attempts", "processed_at"])
+    return True
+
+
+def process_pending_events(batch_size=BATCH_SIZE):
+    # Rows are claimed one at a time with SKIP LOCKED, so concurrent workers
+    # split the inbox. A failing event stays pending until it runs out of
+    # attempts; within one run it is tried once.
+    seen = []
+    processed = 0
+    while True:
+        event_ids = list(
+            WebhookEvent.objects.filter(status="pending")
+            .exclude(id__in=seen)
+            .order_by("received_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not event_ids:
+            break
+
+        for event_id in event_ids:
+            processed += _process_claimed(event_id)
+        seen += event_ids
+
+        if len(event_ids) < batch_size:
+            break
+
+    return processed
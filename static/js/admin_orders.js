@@ -15,4 +15,13 @@ document.addEventListener("DOMContentLoaded", () => {
     denyModal.classList.add("hidden");
     denyModal.classList.remove("flex");
   });
+
+  const selectAll = document.getElementById("selectAll");
+  if (selectAll) {
+    selectAll.addEventListener("change", () => {
+      document.querySelectorAll(".orderSelect").forEach(box => {
+        box.checked = selectAll.checked;
+      });
+    });
+  }
 });
\ No newline at end of file
@@ -14,14 +14,20 @@ document.addEventListener("DOMContentLoaded", () => {
   const nextBtn = document.getElementById("next-btn");
 
   if (imgElement && images.length > 1) {
+    const show = () => {
+      // the srcset only describes the first image
+      imgElement.removeAttribute("srcset");
+      imgElement.src = images[index];
+    };
+
     prevBtn?.addEventListener("click", () => {
       index = (index - 1 + images.length) % images.length;
-      imgElement.src = images[index];
+      show();
     });
 
     nextBtn?.addEventListener("click", () => {
       index = (index + 1) % images.length;
-      imgElement.src = images[index];
+      show();
     });
   }
 
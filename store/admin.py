@@ -6,6 +6,7 @@ from .models import (
     ProductVariant,
     ProductImage,
     ProductVariantReservation,
+    StorageDeletion,
 )
 
 
@@ -111,9 +112,13 @@ class ProductVariantAdmin(admin.ModelAdmin):
         "product__name",
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_availability()
+
     def available_quantity_display(self, obj):
-        return obj.available_quantity()
+        return obj.available
     available_quantity_display.short_description = "Available"
+    available_quantity_display.admin_order_field = "available"
 
 
 # ---------------------------
@@ -131,6 +136,20 @@ class ProductImageAdmin(admin.ModelAdmin):
     ordering = ("product", "order")
 
 
+@admin.register(StorageDeletion)
+class StorageDeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "staged",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+    )
+
+    search_fields = ("name",)
+    readonly_fields = ("name", "staged", "attempts", "last_error", "created_at")
+
+
 # ---------------------------
 # RESERVATIONS
 # ---------------------------
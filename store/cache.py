@@ -0,0 +1,61 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "store:version:{}"
+PRODUCT_VERSION = "product:{}"
+# only the size picker shows availability, so stock and holds bump this alone
+PRODUCT_SIZES_VERSION = "product_sizes:{}"
+RELATED_VERSION = "related"
+
+
+def version_seed():
+    # Counters live in an evictable cache. A lost one restarts from the clock
+    # (microseconds), above any value it reached before, so entries cached under
+    # an old version are never served again.
+    return time.time_ns() // 1000
+
+
+def get_version(name):
+    return cache.get_or_set(VERSION_KEY.format(name), version_seed, timeout=None)
+
+
+def bump_version(name):
+    key = VERSION_KEY.format(name)
+    seed = version_seed()
+    if cache.add(key, seed, timeout=None):
+        return seed
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, seed, timeout=None)
+        return seed
+
+
+def get_product_version(product_id):
+    return get_version(PRODUCT_VERSION.format(product_id))
+
+
+def get_product_sizes_version(product_id):
+    return get_version(PRODUCT_SIZES_VERSION.format(product_id))
+
+
+def _bump_on_commit(template, product_ids):
+    # after commit, so a concurrent render can't cache pre-commit rows under the new version
+    product_ids = set(product_ids)
+
+    def bump():
+        for product_id in product_ids:
+            bump_version(template.format(product_id))
+
+    if product_ids:
+        transaction.on_commit(bump)
+
+
+def bump_product_versions(product_ids):
+    _bump_on_commit(PRODUCT_VERSION, product_ids)
+
+
+def bump_product_sizes_versions(product_ids):
+    _bump_on_commit(PRODUCT_SIZES_VERSION, product_ids)
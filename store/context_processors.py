@@ -1,6 +1,6 @@
-from .models import Category
+from .reference import get_categories
 
 def categories_processor(request):
     return {
-        "categories": Category.objects.all()
-    }
\ No newline at end of file
+        "categories": get_categories()
+    }
@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper
+from django.utils import timezone
+
+from .cache import RELATED_VERSION, bump_product_versions, bump_version
+from .facets import FACETS_VERSION
+from .models import DiscountTransition, Product, discount_active_condition, effective_price_expression
+from .suggestions import mark_products_changed
+
+BATCH_SIZE = 500
+
+
+def _sync_flags(product_ids):
+    Product.objects.filter(id__in=product_ids).update(
+        is_discounted=ExpressionWrapper(discount_active_condition(), output_field=BooleanField()),
+        current_price=effective_price_expression(discounted=discount_active_condition()),
+    )
+
+
+def invalidate_discounted_products(product_ids):
+    # everything that renders a price for these products
+    mark_products_changed(product_ids)
+    bump_product_versions(product_ids)
+    bump_version(FACETS_VERSION)
+    bump_version(RELATED_VERSION)
+
+
+def schedule_discounts(product_ids):
+    # replaces the pending transitions of these products with their current windows
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        DiscountTransition.objects.filter(product_id__in=product_ids).delete()
+        _sync_flags(product_ids)
+
+        rows = []
+        windows = Product.objects.filter(id__in=product_ids, discount_percent__gt=0).values_list(
+            "id", "discount_start", "discount_end"
+        )
+        for product_id, start, end in windows:
+            if start and start > now:
+                rows.append(DiscountTransition(product_id=product_id, kind="start", at=start))
+            if end and end > now:
+                rows.append(DiscountTransition(product_id=product_id, kind="end", at=end))
+        DiscountTransition.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+def apply_due_transitions(now=None):
+    # strictly before now: a window is still open at the instant it ends
+    now = now or timezone.now()
+    applied = 0
+
+    while True:
+        with transaction.atomic():
+            due = list(
+                DiscountTransition.objects.select_for_update(skip_locked=True)
+                .filter(at__lt=now)
+                .order_by("at", "id")
+                .values_list("id", "product_id")[:BATCH_SIZE]
+            )
+            if not due:
+                break
+
+            product_ids = {product_id for _, product_id in due}
+            Product.objects.filter(id__in=product_ids, discount_end__lt=now).update(
+                discount_percent=0, discount_start=None, discount_end=None
+            )
+            _sync_flags(product_ids)
+            DiscountTransition.objects.filter(id__in=[transition_id for transition_id, _ in due]).delete()
+            transaction.on_commit(lambda ids=product_ids: invalidate_discounted_products(ids))
+
+        applied += len(due)
+
+    return applied
@@ -0,0 +1,107 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import ProductVariant
+
+CHUNK_SIZE = 2000
+
+
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class _Echo:
+    # csv.writer target that hands each formatted row straight back
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    # customer-typed text could start a spreadsheet formula; a leading quote keeps it text
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_lines, "text/csv", "csv"),
+    "jsonl": (jsonl_lines, "application/x-ndjson", "jsonl"),
+}
+
+
+def _date_or_none(value):
+    # well-formed but impossible dates (2026-02-30) raise; treat them like no bound
+    try:
+        return parse_date(value or "")
+    except ValueError:
+        return None
+
+
+def created_between(since=None, until=None, field="created_at"):
+    # YYYY-MM-DD bounds, both inclusive; a range on the column itself so its index applies
+    filters = {}
+    since, until = _date_or_none(since), _date_or_none(until)
+    if since:
+        filters[f"{field}__gte"] = timezone.make_aware(datetime.combine(since, time.min))
+    if until:
+        filters[f"{field}__lt"] = timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min))
+    return filters
+
+
+# An export is (columns, queryset of values_list rows). Rows are pulled
+# CHUNK_SIZE at a time through .iterator(), a server-side cursor where the
+# database has one, so memory stays flat however many rows there are.
+def export_lines(export, fmt, **filters):
+    columns, queryset = export(**filters)
+    write = FORMATS[fmt][0]
+    return write(columns, queryset.iterator(chunk_size=CHUNK_SIZE))
+
+
+def streaming_export(name, export, fmt, **filters):
+    _, content_type, extension = FORMATS[fmt]
+    response = StreamingHttpResponse(export_lines(export, fmt, **filters), content_type=content_type)
+    stamp = timezone.localdate().isoformat()
+    response["Content-Disposition"] = f'attachment; filename="{name}-{stamp}.{extension}"'
+    return response
+
+
+def product_export(status=None, since=None, until=None):
+    # one row per variant
+    columns = [
+        "product_id", "sku", "name", "slug", "category", "status",
+        "price", "discount_percent", "effective_price", "rating_average", "rating_count",
+        "created_at", "variant_id", "size", "stock", "reserved_quantity",
+    ]
+    variants = ProductVariant.objects.filter(**created_between(since, until, "product__created_at"))
+    if status:
+        variants = variants.filter(product__status=status)
+
+    rows = (
+        variants.annotate(effective_price=F("product__current_price"))
+        .order_by("product_id", "size_order", "id")
+        .values_list(
+            "product_id", "product__sku", "product__name", "product__slug", "product__category__name",
+            "product__status", "product__price", "product__discount_percent", "effective_price",
+            "product__rating_average", "product__rating_count", "product__created_at",
+            "id", "size", "stock", "reserved_quantity",
+        )
+    )
+    return columns, rows
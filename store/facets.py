@@ -0,0 +1,140 @@
+import hashlib
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .cache import get_version
+from .models import size_available_condition, size_mask_for
+
+FACETS_VERSION = "facets"
+DISCOUNT_LEVELS = (10, 20, 30, 50)
+RATING_LEVELS = (4, 3, 2, 1)
+DEFAULT_PRICE_BUCKETS = ((0, 25), (25, 50), (50, 75), (75, 100), (100, 150), (150, None))
+CENT = Decimal("0.01")
+
+
+def _price_buckets():
+    return getattr(settings, "FACET_PRICE_BUCKETS", DEFAULT_PRICE_BUCKETS)
+
+
+def _last_cent_below(high):
+    # buckets are [low, high) but max_price is inclusive; prices are whole cents,
+    # so the bucket's link stops one cent short of high
+    if high is None:
+        return None
+    return Decimal(str(high)) - CENT
+
+
+def _decimal_or_none(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def filter_state(params, sizes):
+    # the same inputs apply_filters reads, normalised so equivalent URLs share a cache entry
+    discount = params.get("discount")
+    min_rating = params.get("min_rating")
+    return {
+        "sizes": sorted(s for s in set(params.getlist("size")) if s in sizes),
+        "min_price": _decimal_or_none(params.get("min_price")),
+        "max_price": _decimal_or_none(params.get("max_price")),
+        "limited": params.get("limited") == "true",
+        "discount": int(discount) if discount and discount.isdigit() else None,
+        "min_rating": int(min_rating) if min_rating in [str(r) for r in RATING_LEVELS] else None,
+    }
+
+
+def _group_conditions(state):
+    groups = {}
+
+    if state["sizes"]:
+        groups["size"] = Q(size_available_condition(size_mask_for(state["sizes"])))
+
+    price = Q()
+    if state["min_price"] is not None:
+        price &= Q(current_price__gte=state["min_price"])
+    if state["max_price"] is not None:
+        price &= Q(current_price__lte=state["max_price"])
+    if price:
+        groups["price"] = price
+
+    if state["limited"]:
+        groups["limited"] = Q(is_limited=True)
+
+    if state["discount"] is not None:
+        groups["discount"] = Q(is_discounted=True, discount_percent__gte=state["discount"])
+
+    if state["min_rating"] is not None:
+        groups["rating"] = Q(rating_average__gte=state["min_rating"])
+
+    return groups
+
+
+def _others(groups, exclude):
+    # a facet's counts ignore its own selection, so choices stay visible
+    condition = Q()
+    for name, group in groups.items():
+        if name != exclude:
+            condition &= group
+    return condition
+
+
+def _compute(queryset, state, sizes):
+    groups = _group_conditions(state)
+    aggregates = {"total": Count("id", filter=_others(groups, None))}
+
+    for i, size in enumerate(sizes):
+        aggregates[f"size_{i}"] = Count(
+            "id", filter=Q(size_available_condition(size_mask_for([size]))) & _others(groups, "size")
+        )
+
+    for i, (low, high) in enumerate(_price_buckets()):
+        bucket = Q(current_price__gte=low)
+        if high is not None:
+            bucket &= Q(current_price__lt=high)
+        aggregates[f"price_{i}"] = Count("id", filter=bucket & _others(groups, "price"))
+
+    for level in DISCOUNT_LEVELS:
+        aggregates[f"discount_{level}"] = Count(
+            "id", filter=Q(is_discounted=True, discount_percent__gte=level) & _others(groups, "discount")
+        )
+
+    for level in RATING_LEVELS:
+        aggregates[f"rating_{level}"] = Count(
+            "id", filter=Q(rating_average__gte=level) & _others(groups, "rating")
+        )
+
+    aggregates["limited"] = Count("id", filter=Q(is_limited=True) & _others(groups, "limited"))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    return {
+        "total": counts["total"],
+        "sizes": {size: counts[f"size_{i}"] for i, size in enumerate(sizes)},
+        "price_buckets": [
+            {"min": low, "max": high, "max_price": _last_cent_below(high), "count": counts[f"price_{i}"]}
+            for i, (low, high) in enumerate(_price_buckets())
+        ],
+        "discounts": {str(level): counts[f"discount_{level}"] for level in DISCOUNT_LEVELS},
+        "ratings": {str(level): counts[f"rating_{level}"] for level in RATING_LEVELS},
+        "limited": counts["limited"],
+    }
+
+
+def get_facets(queryset, params, sizes, scope):
+    state = filter_state(params, sizes)
+    digest = hashlib.md5(
+        json.dumps([scope, state], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    key = f"store:facets:{get_version(FACETS_VERSION)}:{digest}"
+
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute(queryset, state, sizes)
+        cache.set(key, facets, getattr(settings, "FACET_CACHE_TIMEOUT", 300))
+    return facets
@@ -1,6 +1,8 @@
 from django import forms
 from django.utils import timezone
 
+from .models import Product
+
 class DiscountForm(forms.Form):
     discount_percent = forms.IntegerField(
         min_value=1, max_value=90,
@@ -29,4 +31,30 @@ class DiscountForm(forms.Form):
                 raise forms.ValidationError("End date/time must be after the start date/time.")
             if end < timezone.now():
                 raise forms.ValidationError("End date/time is in the past.")
-        return cleaned
\ No newline at end of file
+        return cleaned
+
+class ProductImportForm(forms.Form):
+    # one row of a bulk import; category, tags and related are resolved per batch by store.imports
+    name = forms.CharField(max_length=200)
+    slug = forms.SlugField(required=False)
+    price = forms.DecimalField(max_digits=8, decimal_places=2, min_value=0)
+    status = forms.ChoiceField(choices=Product.STATUS_CHOICES, required=False)
+    discount_percent = forms.IntegerField(min_value=0, max_value=90, required=False)
+    discount_start = forms.DateTimeField(required=False)
+    discount_end = forms.DateTimeField(required=False)
+    is_limited = forms.BooleanField(required=False)
+    category = forms.CharField(required=False)
+    tags = forms.CharField(required=False)
+    related = forms.CharField(required=False)
+
+    def __init__(self, *args, sizes=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for size in sizes:
+            self.fields[f"stock_{size}"] = forms.IntegerField(min_value=0, required=False)
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end = cleaned.get("discount_start"), cleaned.get("discount_end")
+        if start and end and end <= start:
+            raise forms.ValidationError("discount_end must be after discount_start.")
+        return cleaned
@@ -0,0 +1,124 @@
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+# fixed widths; an original narrower than one is never upscaled
+RENDITIONS = {
+    "thumb": 320,
+    "card": 640,
+    "zoom": 1600,
+}
+WEBP_QUALITY = 80
+
+logger = logging.getLogger(__name__)
+
+# Uploads wait here until the worker has pushed them to the media storage.
+# Web and worker processes must share this directory (one host, or a shared
+# volume mounted at IMAGE_STAGING_ROOT in every container).
+staging_storage = FileSystemStorage(location=settings.IMAGE_STAGING_ROOT)
+
+
+def schedule_processing(image_ids):
+    from .tasks import process_product_image
+
+    for image_id in image_ids:
+        transaction.on_commit(lambda image_id=image_id: process_product_image.delay(image_id))
+
+
+def stage_images(product, uploads):
+    # [(uploaded file, order)] -> ProductImage rows, processed after commit
+    from .models import ProductImage
+
+    images = []
+    for upload, order in uploads:
+        ext = os.path.splitext(upload.name)[1].lower()
+        staged = staging_storage.save(f"product-{product.pk}/upload{ext}", upload)
+        images.append(ProductImage.objects.create(product=product, order=order, staged_name=staged))
+
+    schedule_processing([image.pk for image in images])
+    return images
+
+
+def render_webp(source, width):
+    image = source.copy()
+    if image.width > width:
+        image.thumbnail((width, width * 10), Image.LANCZOS)
+    out = BytesIO()
+    image.save(out, "WEBP", quality=WEBP_QUALITY, method=6)
+    return image.width, out.getvalue()
+
+
+def _rendition_name(image, kind):
+    base = os.path.splitext(image.image.name)[0]
+    return f"{base}-{kind}.webp"
+
+
+def build_renditions(image):
+    # renditions of image.image, stored next to the original
+    with image.image.open("rb") as original:
+        source = ImageOps.exif_transpose(Image.open(original))
+        source.load()
+    if source.mode not in ("RGB", "RGBA"):
+        source = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+
+    renditions = {}
+    for kind, width in RENDITIONS.items():
+        actual_width, data = render_webp(source, width)
+        name = default_storage.save(_rendition_name(image, kind), ContentFile(data))
+        renditions[kind] = {"name": name, "url": default_storage.url(name), "width": actual_width}
+    return renditions
+
+
+def process_image(image_id):
+    from .models import ProductImage
+
+    image = ProductImage.objects.select_related("product").filter(pk=image_id).first()
+    if image is None:
+        return False
+
+    staged = image.staged_name
+    if staged and not staging_storage.exists(staged):
+        logger.error(
+            "Staged upload %s of image %s is missing; IMAGE_STAGING_ROOT must be shared "
+            "by the web and worker processes", staged, image_id,
+        )
+        return False
+    if staged:
+        # the original goes to the media storage first, under the usual upload_to path
+        with staging_storage.open(staged, "rb") as upload:
+            image.image.save(os.path.basename(staged), File(upload), save=False)
+        image.staged_name = ""
+
+    if not image.image:
+        return False
+
+    image.renditions = build_renditions(image)
+    # a regular save, so the image signals refresh suggestions and product pages
+    image.save(update_fields=["image", "staged_name", "renditions"])
+    if staged:
+        staging_storage.delete(staged)
+    return True
+
+
+def refresh_urls(batch_size=500):
+    # re-resolve the cached URLs, e.g. after MEDIA_URL or the Cloudinary account changed
+    from .models import ProductImage
+
+    images = ProductImage.objects.exclude(image="").order_by("id")
+    count = 0
+    for start in range(0, images.count(), batch_size):
+        batch = list(images[start:start + batch_size])
+        for image in batch:
+            image.image_url = image.image.url
+            for rendition in image.renditions.values():
+                rendition["url"] = default_storage.url(rendition["name"])
+        ProductImage.objects.bulk_update(batch, ["image_url", "renditions"])
+        count += len(batch)
+    return count
+
@@ -0,0 +1,252 @@
+import csv
+import io
+import json
+from collections import namedtuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max
+from django.utils.text import slugify
+
+from .cache import bump_version
+from .discounts import schedule_discounts
+from .facets import FACETS_VERSION
+from .forms import ProductImportForm
+from .models import Category, Product, ProductVariant, Tag, refresh_size_masks
+from .recommendations import schedule_related_refresh
+from .reference import invalidate_reference_data
+from .search import refresh_search_documents
+from .suggestions import mark_products_changed
+
+BATCH_SIZE = 500
+SIZES = [size for size, _ in ProductVariant.SIZE_CHOICES]
+LIST_SEPARATOR = "|"
+
+ImportReport = namedtuple("ImportReport", ["created", "errors"])
+
+
+# ---------------------------
+# READING
+# ---------------------------
+def _flatten(row):
+    # JSONL may carry lists and a {"XS": 3} stock object; CSV has the flat columns
+    row = dict(row)
+    for key in ("tags", "related"):
+        if isinstance(row.get(key), list):
+            row[key] = LIST_SEPARATOR.join(str(value) for value in row[key])
+    stock = row.pop("stock", None)
+    if isinstance(stock, dict):
+        for size, quantity in stock.items():
+            row[f"stock_{size}"] = quantity
+    return row
+
+
+def read_rows(stream, fmt):
+    # -> (line number, row dict or None, parse error or None)
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(stream), start=2):
+            yield number, row, None
+        return
+
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, None, f"invalid JSON: {exc}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        yield number, _flatten(row), None
+
+
+# ---------------------------
+# WRITING
+# ---------------------------
+def _reserve_product_ids(count):
+    # SKUs are P + the primary key; taking the keys up front lets one INSERT write both
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [Product._meta.db_table, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    # elsewhere the import's transaction is the only writer
+    start = (Product.objects.aggregate(last=Max("id"))["last"] or 0) + 1
+    return list(range(start, start + count))
+
+
+def _split(value):
+    return [part.strip() for part in (value or "").split(LIST_SEPARATOR) if part.strip()]
+
+
+class ProductImporter:
+    def __init__(self):
+        self.categories = {}
+        for category in Category.objects.all():
+            self.categories[category.slug.lower()] = category.id
+            self.categories[category.name.lower()] = category.id
+        self.tags = {name.lower(): tag_id for tag_id, name in Tag.objects.values_list("id", "name")}
+        self.created = []
+        self.errors = []
+        self.related = []       # (line number, product id, [slugs]), linked once every batch is in
+        self.new_tags = False
+
+    def run(self, rows):
+        batch = []
+        for number, row, error in rows:
+            if error:
+                self.errors.append((number, error))
+                continue
+            batch.append((number, row))
+            if len(batch) >= BATCH_SIZE:
+                self._import_batch(batch)
+                batch = []
+        if batch:
+            self._import_batch(batch)
+
+        self._link_related()
+        # one rescoring pass for the whole import rather than one per batch
+        schedule_related_refresh(self.created)
+        if self.new_tags:
+            invalidate_reference_data()
+        return ImportReport(self.created, sorted(self.errors))
+
+    def _validate(self, batch):
+        valid = []
+        for number, row in batch:
+            form = ProductImportForm(row, sizes=SIZES)
+            if not form.is_valid():
+                message = "; ".join(
+                    f"{field}: {' '.join(errors)}" if field != "__all__" else " ".join(errors)
+                    for field, errors in form.errors.items()
+                )
+                self.errors.append((number, message))
+                continue
+
+            data = form.cleaned_data
+            data["slug"] = data["slug"] or slugify(data["name"])
+            if not data["slug"]:
+                self.errors.append((number, "slug: can't be derived from the name, give one"))
+                continue
+            if data["category"] and data["category"].lower() not in self.categories:
+                self.errors.append((number, f"category: unknown category {data['category']!r}"))
+                continue
+            valid.append((number, data))
+
+        # slugs must be new, and unique within the file; earlier batches are already in the table
+        slugs = [data["slug"] for _, data in valid]
+        taken = set(Product.objects.filter(slug__in=slugs).values_list("slug", flat=True))
+        unique = []
+        for number, data in valid:
+            if data["slug"] in taken:
+                self.errors.append((number, f"slug: {data['slug']!r} already exists"))
+                continue
+            taken.add(data["slug"])
+            unique.append((number, data))
+        return unique
+
+    def _create_tags(self, names):
+        missing = {name for name in names if name.lower() not in self.tags}
+        if not missing:
+            return
+        Tag.objects.bulk_create([Tag(name=name) for name in sorted(missing)], ignore_conflicts=True)
+        self.tags.update(
+            (name.lower(), tag_id)
+            for tag_id, name in Tag.objects.filter(name__in=missing).values_list("id", "name")
+        )
+        self.new_tags = True
+
+    def _import_batch(self, batch):
+        rows = self._validate(batch)
+        if not rows:
+            return
+
+        self._create_tags(name for _, data in rows for name in _split(data["tags"]))
+        try:
+            ids = self._write_batch(rows)
+        except IntegrityError as exc:
+            # e.g. a slug taken by someone else mid-import; nothing of this batch was written
+            self.errors.extend((number, f"not imported: {exc}") for number, _ in rows)
+            return
+
+        self.created.extend(ids)
+        self._refresh(ids)
+
+    def _write_batch(self, rows):
+        with transaction.atomic():
+            ids = _reserve_product_ids(len(rows))
+            products, variants, tag_links = [], [], []
+
+            for product_id, (number, data) in zip(ids, rows):
+                product = Product(
+                    id=product_id,
+                    sku=f"P{product_id:06d}",
+                    name=data["name"],
+                    slug=data["slug"],
+                    price=data["price"],
+                    status=data["status"] or "draft",
+                    discount_percent=data["discount_percent"] or 0,
+                    discount_start=data["discount_start"],
+                    discount_end=data["discount_end"],
+                    is_limited=data["is_limited"],
+                    category_id=self.categories.get((data["category"] or "").lower()),
+                )
+                product.is_discounted = product.discount_window_open
+                product.current_price = product.final_price
+                products.append(product)
+
+                for size in SIZES:
+                    variants.append(ProductVariant(
+                        product_id=product_id,
+                        size=size,
+                        stock=data[f"stock_{size}"] or 0,
+                        size_order=ProductVariant.SIZE_ORDER[size],
+                    ))
+                tag_links.extend(
+                    Product.tags.through(product_id=product_id, tag_id=tag_id)
+                    for tag_id in {self.tags[name.lower()] for name in _split(data["tags"])}
+                )
+                if _split(data["related"]):
+                    self.related.append((number, product_id, _split(data["related"])))
+
+            Product.objects.bulk_create(products)
+            ProductVariant.objects.bulk_create(variants)
+            Product.tags.through.objects.bulk_create(tag_links)
+        return ids
+
+    def _link_related(self):
+        if not self.related:
+            return
+        slugs = {slug for _, _, related in self.related for slug in related}
+        ids = dict(Product.objects.filter(slug__in=slugs).values_list("slug", "id"))
+
+        links = []
+        for number, product_id, related in self.related:
+            unknown = [slug for slug in related if slug not in ids]
+            if unknown:
+                self.errors.append((number, f"related: unknown product(s) {', '.join(unknown)}; linked the rest"))
+            links.extend(
+                Product.related_products.through(from_product_id=product_id, to_product_id=ids[slug])
+                for slug in dict.fromkeys(related) if slug in ids and ids[slug] != product_id
+            )
+        Product.related_products.through.objects.bulk_create(links, ignore_conflicts=True)
+
+    def _refresh(self, product_ids):
+        # what the post_save signals would have done, once per batch
+        refresh_search_documents(product_ids)
+        refresh_size_masks(product_ids)
+        mark_products_changed(product_ids)
+        schedule_discounts(product_ids)
+        bump_version(FACETS_VERSION)
+
+
+def import_products(stream, fmt):
+    return ProductImporter().run(read_rows(stream, fmt))
+
+
+def import_uploaded_file(upload, fmt=None):
+    fmt = fmt or ("jsonl" if upload.name.lower().endswith((".jsonl", ".ndjson")) else "csv")
+    return import_products(io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline=""), fmt)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from store.images import process_image
+from store.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = "Build the WebP renditions of product images that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rebuild every image, not only the missing ones.")
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.order_by("id")
+        if not options["all"]:
+            images = images.filter(renditions={})
+
+        count = 0
+        for image_id in images.values_list("id", flat=True).iterator():
+            try:
+                count += process_image(image_id)
+            except OSError as exc:
+                # unreadable or missing file; the rest still get their renditions
+                self.stderr.write(f"Image {image_id}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} image(s)."))
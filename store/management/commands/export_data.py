@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from orders.exports import order_export
+from store.exports import FORMATS, export_lines, product_export
+
+EXPORTS = {
+    "orders": order_export,
+    "products": product_export,
+}
+
+
+class Command(BaseCommand):
+    help = "Stream orders or products to a CSV or JSON Lines file (stdout by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(EXPORTS))
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--status")
+        parser.add_argument("--since", help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--until", help="YYYY-MM-DD, inclusive")
+        parser.add_argument("--output", help="file to write instead of stdout")
+
+    def handle(self, *args, **options):
+        lines = export_lines(
+            EXPORTS[options["kind"]], options["format"],
+            status=options["status"], since=options["since"], until=options["until"],
+        )
+
+        out = open(options["output"], "w", newline="", encoding="utf-8") if options["output"] else sys.stdout
+        count = 0
+        try:
+            for line in lines:
+                out.write(line)
+                count += 1
+        finally:
+            if options["output"]:
+                out.close()
+
+        if options["output"]:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {count} line(s) to {options['output']}."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.imports import import_products
+
+
+class Command(BaseCommand):
+    help = "Bulk-create products with their variants, tags and related links from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.lower().endswith((".jsonl", ".ndjson")) else "csv")
+
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as stream:
+                report = import_products(stream, fmt)
+        except OSError as exc:
+            raise CommandError(exc)
+
+        for line, error in report.errors:
+            self.stderr.write(f"line {line}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(report.created)} product(s), {len(report.errors)} error(s)."
+        ))
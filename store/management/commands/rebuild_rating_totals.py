@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.cache import bump_version
+from store.facets import FACETS_VERSION
+from store.models import rebuild_rating_totals
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored rating totals and histograms from the reviews table."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_rating_totals()
+        bump_version(FACETS_VERSION)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating totals for {count} reviewed product(s)."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from store.storage_cleanup import find_orphans, reconcile_orphans
+
+
+class Command(BaseCommand):
+    help = "Queue stored product image files that no image refers to for deletion."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="products", help="Storage directory to scan.")
+        parser.add_argument("--dry-run", action="store_true", help="List the orphans without queueing them.")
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            orphans = find_orphans(options["prefix"])
+            for name in orphans:
+                self.stdout.write(name)
+            self.stdout.write(self.style.SUCCESS(f"Found {len(orphans)} orphaned file(s)."))
+            return
+
+        orphans = reconcile_orphans(options["prefix"])
+        self.stdout.write(self.style.SUCCESS(f"Queued {len(orphans)} orphaned file(s) for deletion."))
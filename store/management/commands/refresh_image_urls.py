@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.images import refresh_urls
+
+
+class Command(BaseCommand):
+    help = "Re-resolve the cached URLs of product images and their renditions."
+
+    def handle(self, *args, **options):
+        count = refresh_urls()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {count} image(s)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.recommendations import refresh_related_products
+
+
+class Command(BaseCommand):
+    help = "Recompute the related-products table for the whole catalog."
+
+    def handle(self, *args, **options):
+        count = refresh_related_products()
+        self.stdout.write(self.style.SUCCESS(f"Scored {count} product(s)."))
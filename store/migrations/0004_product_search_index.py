@@ -0,0 +1,80 @@
+# Generated by Django 6.0.3 on 2026-10-18 12:00
+
+from django.db import migrations
+
+# Frozen copy of the schema and backfill at this point in history; the runtime
+# search module may change without changing what this migration does.
+SEARCH_TABLE = "store_product_search"
+BATCH_SIZE = 500
+
+
+def _document_rows(Product):
+    qs = Product.objects.select_related("category").prefetch_related("tags").order_by("id")
+    for p in qs.iterator(chunk_size=BATCH_SIZE):
+        yield (
+            p.id,
+            p.name or "",
+            " ".join(t.name for t in p.tags.all()),
+            p.category.name if p.category else "",
+            p.sku or "",
+        )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE {SEARCH_TABLE} ("
+            "product_id bigint PRIMARY KEY REFERENCES store_product (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {SEARCH_TABLE}_document_gin ON {SEARCH_TABLE} USING gin (document)"
+        )
+        insert = (
+            f"INSERT INTO {SEARCH_TABLE} (product_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || "
+            "setweight(to_tsvector('simple', %s), 'B') || "
+            "setweight(to_tsvector('simple', %s), 'C') || "
+            "setweight(to_tsvector('simple', %s), 'A'))"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            "name, tags, category, sku, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        insert = (
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, tags, category, sku) "
+            "VALUES (%s, %s, %s, %s, %s)"
+        )
+    else:
+        return
+
+    rows = []
+    with schema_editor.connection.cursor() as cursor:
+        for row in _document_rows(apps.get_model("store", "Product")):
+            rows.append(row)
+            if len(rows) >= BATCH_SIZE:
+                cursor.executemany(insert, rows)
+                rows = []
+        if rows:
+            cursor.executemany(insert, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ("postgresql", "sqlite"):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0003_product_discount_end_product_discount_start_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.3 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+SIZES = ["XS", "S", "M", "L", "XL", "2XL"]
+
+
+def backfill_size_masks(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    ProductVariant = apps.get_model("store", "ProductVariant")
+
+    masks = {}
+    for product_id, size in ProductVariant.objects.filter(stock__gt=0).values_list("product_id", "size"):
+        masks[product_id] = masks.get(product_id, 0) | (1 << SIZES.index(size))
+
+    by_mask = {}
+    for product_id, mask in masks.items():
+        by_mask.setdefault(mask, []).append(product_id)
+    for mask, product_ids in by_mask.items():
+        Product.objects.filter(id__in=product_ids).update(size_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='size_mask',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_size_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 6.0.3 on 2026-10-18 11:48
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_totals(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    Review = apps.get_model("accounts", "Review")
+
+    totals = Review.objects.values("product_id").annotate(
+        total=Sum("rating"),
+        count=Count("id"),
+        **{f"stars_{star}": Count("id", filter=Q(rating=star)) for star in range(1, 6)},
+    ).order_by()
+
+    for row in totals:
+        Product.objects.filter(id=row["product_id"]).update(
+            rating_sum=row["total"],
+            rating_count=row["count"],
+            rating_average=(Decimal(row["total"]) / row["count"]).quantize(Decimal("0.01"), ROUND_HALF_UP),
+            **{f"rating_{star}": row[f"stars_{star}"] for star in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_product_size_mask'),
+        ('accounts', '0002_review'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_average',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'rating_average', 'id'], name='store_produ_status_548d34_idx'),
+        ),
+        migrations.RunPython(backfill_rating_totals, migrations.RunPython.noop),
+    ]
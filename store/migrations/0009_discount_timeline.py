@@ -0,0 +1,55 @@
+# Generated by Django 6.0.3 on 2026-10-18 11:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_discount_timeline(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+    DiscountTransition = apps.get_model("store", "DiscountTransition")
+
+    now = timezone.now()
+    active, transitions = [], []
+    windows = Product.objects.filter(discount_percent__gt=0).values_list("id", "discount_start", "discount_end")
+    for product_id, start, end in windows:
+        if (start is None or start <= now) and (end is None or end >= now):
+            active.append(product_id)
+        if start and start > now:
+            transitions.append(DiscountTransition(product_id=product_id, kind="start", at=start))
+        if end and end > now:
+            transitions.append(DiscountTransition(product_id=product_id, kind="end", at=end))
+
+    Product.objects.filter(id__in=active).update(is_discounted=True)
+    Product.objects.filter(discount_end__lt=now).update(
+        discount_percent=0, discount_start=None, discount_end=None
+    )
+    DiscountTransition.objects.bulk_create(transitions, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_product_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_discounted',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='DiscountTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('start', 'Start'), ('end', 'End')], max_length=5)),
+                ('at', models.DateTimeField(db_index=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discount_transitions', to='store.product')),
+            ],
+            options={
+                'ordering': ['at', 'id'],
+            },
+        ),
+        migrations.RunPython(backfill_discount_timeline, migrations.RunPython.noop),
+    ]
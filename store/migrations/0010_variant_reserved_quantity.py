@@ -0,0 +1,39 @@
+# Generated by Django 6.0.3 on 2026-10-18 11:58
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_reserved_quantity(apps, schema_editor):
+    ProductVariant = apps.get_model("store", "ProductVariant")
+    ProductVariantReservation = apps.get_model("store", "ProductVariantReservation")
+
+    totals = (
+        ProductVariantReservation.objects.values("variant_id")
+        .annotate(total=Sum("quantity"))
+        .order_by()
+    )
+    for row in totals:
+        ProductVariant.objects.filter(id=row["variant_id"]).update(reserved_quantity=row["total"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_discount_timeline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productvariant',
+            name='reserved_quantity',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='productvariantreservation',
+            index=models.Index(fields=['variant', 'reserved_until'], name='store_produ_variant_1e0fb8_idx'),
+        ),
+        migrations.RunPython(backfill_reserved_quantity, migrations.RunPython.noop),
+    ]
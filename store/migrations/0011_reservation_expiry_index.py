@@ -0,0 +1,18 @@
+# Generated by Django 6.0.3 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0010_variant_reserved_quantity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productvariantreservation',
+            name='reserved_until',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
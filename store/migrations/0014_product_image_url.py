@@ -0,0 +1,30 @@
+# Generated by Django 6.0.3 on 2026-10-18 12:21
+
+from django.db import migrations, models
+
+
+def backfill_image_url(apps, schema_editor):
+    ProductImage = apps.get_model("store", "ProductImage")
+
+    images = ProductImage.objects.exclude(image="").order_by("id").only("id", "image")
+    for start in range(0, images.count(), 500):
+        batch = list(images[start:start + 500])
+        for image in batch:
+            image.image_url = image.image.url
+        ProductImage.objects.bulk_update(batch, ["image_url"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_storage_deletion_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='image_url',
+            field=models.CharField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.RunPython(backfill_image_url, migrations.RunPython.noop),
+    ]
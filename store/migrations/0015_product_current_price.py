@@ -0,0 +1,44 @@
+# Generated by Django 6.0.3 on 2026-10-18 12:42
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+
+
+def backfill_current_price(apps, schema_editor):
+    Product = apps.get_model("store", "Product")
+
+    products = Product.objects.order_by("id").only("id", "price", "discount_percent", "is_discounted")
+    for start in range(0, products.count(), 500):
+        batch = list(products[start:start + 500])
+        for product in batch:
+            product.current_price = product.price
+            if product.is_discounted:
+                product.current_price = (product.price * (100 - product.discount_percent) / 100).quantize(
+                    Decimal("0.01"), ROUND_HALF_UP
+                )
+        Product.objects.bulk_update(batch, ["current_price"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_product_image_url'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='store_produ_status_807d51_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='current_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=8),
+        ),
+        migrations.RunPython(backfill_current_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'current_price', 'id'], name='store_produ_status_bb7401_idx'),
+        ),
+    ]
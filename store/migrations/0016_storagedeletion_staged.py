@@ -0,0 +1,18 @@
+# Generated by Django 6.0.3 on 2026-10-18 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_product_current_price'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storagedeletion',
+            name='staged',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,12 +1,26 @@
-from decimal import Decimal
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
 from django.db import models
 import os
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.utils import timezone
 from django.conf import settings
-from django.db.models import Avg, Count, Case, When, Value, F, Q
+from django.db.models import Count, Value, Case, When, F, Q, OuterRef, Prefetch, Subquery, ExpressionWrapper, Sum
+from django.db.models.lookups import GreaterThan
+from django.db.models.functions import Cast, Coalesce, Floor, Round
 from django.core.validators import MaxValueValidator
 
+def _skip_counter_fields(instance, kwargs, fields):
+    # an existing row saved without update_fields writes every column except these
+    if instance._state.adding or kwargs.get("update_fields") is not None:
+        return
+    kwargs["update_fields"] = [
+        f.name for f in instance._meta.concrete_fields
+        if not f.primary_key and f.name not in fields
+    ]
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True)
@@ -21,6 +35,74 @@ class Tag(models.Model):
         self.name = self.name.upper()
         super().save(*args, **kwargs)
 
+class RoundedDecimalField(models.DecimalField):
+    # Output field for computed prices; SQLite hands expressions back unquantized
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(value).quantize(Decimal(1).scaleb(-self.decimal_places))
+
+
+def discount_active_condition(prefix=""):
+    now = timezone.now()
+    return (
+        Q(**{f"{prefix}discount_percent__gt": 0})
+        & (Q(**{f"{prefix}discount_start__isnull": True}) | Q(**{f"{prefix}discount_start__lte": now}))
+        & (Q(**{f"{prefix}discount_end__isnull": True}) | Q(**{f"{prefix}discount_end__gte": now}))
+    )
+
+
+def effective_price_expression(prefix="", discounted=None):
+    # whole cents, rounded half up: the same result as Product.final_price on every backend.
+    # is_discounted is kept in step with the discount window by store.discounts, which
+    # passes the window itself as discounted while it rewrites that flag.
+    cents = Round(F(f"{prefix}price") * 100, 0)
+    discounted_cents = Floor((cents * (100 - F(f"{prefix}discount_percent")) + 50) / 100)
+    if discounted is None:
+        discounted = Q(**{f"{prefix}is_discounted": True})
+    return Case(
+        When(discounted, then=Round(discounted_cents * Value(Decimal("0.01")), 2)),
+        default=F(f"{prefix}price"),
+        output_field=RoundedDecimalField(max_digits=8, decimal_places=2),
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_effective_price(self):
+        # the stored column, so price filters and sorts use the keyset index
+        return self.annotate(effective_price=F("current_price"))
+
+    def on_sale(self):
+        return self.filter(is_discounted=True)
+
+    def for_listing(self):
+        # Everything a product card needs, in a fixed number of queries per page
+        image_count = (
+            ProductImage.objects.ready().filter(product=OuterRef("pk"))
+            .order_by()
+            .values("product")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+
+        return (
+            self.with_effective_price()
+            .annotate(
+                image_count=Coalesce(Subquery(image_count), 0),
+                in_stock=ExpressionWrapper(Q(size_mask__gt=0), output_field=models.BooleanField()),
+            )
+            .prefetch_related(
+                Prefetch("images", queryset=ProductImage.objects.ready().order_by("order"))
+            )
+        )
+
+    def with_sizes_available(self, sizes):
+        mask = size_mask_for(sizes)
+        if not mask:
+            return self
+        return self.filter(size_available_condition(mask))
+
+
 class Product(models.Model):
     STATUS_CHOICES = [("draft", "Draft"), ("active", "Active"), ("archived", "Archived")]
     name = models.CharField(max_length=200)
@@ -33,7 +115,31 @@ class Product(models.Model):
     discount_start = models.DateTimeField(null=True, blank=True)
     discount_end = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="draft", db_index=True)
+    # the discount window is open right now; flipped by store.discounts when a transition fires
+    is_discounted = models.BooleanField(default=False, editable=False, db_index=True)
+    # final_price, written with is_discounted (save() and store.discounts)
+    current_price = models.DecimalField(max_digits=8, decimal_places=2, default=0, editable=False)
     is_limited = models.BooleanField(default=False)
+    # one bit per ProductVariant.SIZE_CHOICES entry with sellable stock
+    size_mask = models.PositiveSmallIntegerField(default=0, editable=False, db_index=True)
+    # review aggregates, kept current by accounts.views (see apply_rating_change)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_average = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+    rating_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    # Maintained with queryset updates; a full save() must not write back stale copies.
+    # size_mask is rewritten by refresh_size_masks whenever variant stock or reservations change,
+    # the rating totals by apply_rating_change on every review.
+    SIZE_COUNTER_FIELDS = ["size_mask"]
+    RATING_COUNTER_FIELDS = ["rating_sum", "rating_count", "rating_average"] + [
+        f"rating_{star}" for star in range(1, 6)
+    ]
+    COUNTER_FIELDS = SIZE_COUNTER_FIELDS + RATING_COUNTER_FIELDS
     created_at = models.DateTimeField(auto_now_add=True)
     published_at = models.DateTimeField(null=True, blank=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name="products")
@@ -42,69 +148,80 @@ class Product(models.Model):
         'self', blank=True, symmetrical=False, related_name='related_to'
     )
 
+    objects = ProductQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # what related-product scores and the discount timeline depend on, to spot changes on save
+        instance._loaded_scoring_state = instance.scoring_state
+        instance._loaded_discount_state = instance.discount_state
+        return instance
+
+    @property
+    def scoring_state(self):
+        return (self.__dict__.get("category_id"), self.__dict__.get("status"))
+
+    @property
+    def discount_state(self):
+        return tuple(self.__dict__.get(f) for f in ("discount_percent", "discount_start", "discount_end"))
+
+    @cached_property
+    def gallery_images(self):
+        return list(self.images.ready().order_by("order"))
+
     def get_related_products(self, limit=15):
-            manual = list(self.related_products.filter(status="active")[:limit])
-
-            if len(manual) >= limit:
-                return manual
-
-            remaining = limit - len(manual)
-            exclude_ids = [p.id for p in manual] + [self.id]
-            tag_ids = list(self.tags.values_list('id', flat=True))
-
-            # If no tags and no category, can't auto-fill
-            if not tag_ids and not self.category:
-                return manual
-
-            # Filter: products that share tags OR category with this product
-            filter_q = Q()
-            if tag_ids:
-                filter_q |= Q(tags__in=tag_ids)
-            if self.category:
-                filter_q |= Q(category=self.category)
-
-            queryset = Product.objects.filter(filter_q).exclude(id__in=exclude_ids).filter(status="active")
-
-            if tag_ids:
-                queryset = queryset.annotate(
-                    shared_tags=Count('tags', filter=Q(tags__in=tag_ids), distinct=True)
-                )
-            else:
-                queryset = queryset.annotate(shared_tags=Value(0))
-
-            # Annotate category match (boolean: 1 if matches, 0 if not)
-            queryset = queryset.annotate(
-                category_match=Case(
-                    When(category=self.category, then=Value(1)),
-                    default=Value(0),
-                    output_field=models.IntegerField()
-                )
-            )
-            queryset = queryset.annotate(
-                score=F('category_match') * 5 + F('shared_tags')
-            )
-            auto = (
-                queryset
-                .filter(score__gt=0)
-                .order_by('-score', '-id')
-                .distinct()[:remaining]
-            )
+        images = Prefetch("images", queryset=ProductImage.objects.ready().order_by("order"))
+        manual = list(
+            self.related_products.filter(status="active").prefetch_related(images)[:limit]
+        )
+
+        if len(manual) >= limit:
+            return manual
+
+        # auto-fill from the precomputed table (see store.recommendations)
+        exclude_ids = [p.id for p in manual] + [self.id]
+        auto = (
+            Product.objects.filter(status="active", recommended_in__product=self)
+            .exclude(id__in=exclude_ids)
+            .order_by("recommended_in__rank")
+            .prefetch_related(images)[:limit - len(manual)]
+        )
+
+        return manual + list(auto)
 
-            return manual + list(auto)    
     class Meta:
         ordering = ["-created_at"]
-        indexes = [models.Index(fields=["status"]), models.Index(fields=["slug"])]
+        indexes = [
+            models.Index(fields=["status"]),
+            models.Index(fields=["slug"]),
+            # keyset pagination, one per sort key
+            models.Index(fields=["status", "created_at", "id"]),
+            models.Index(fields=["status", "name", "id"]),
+            models.Index(fields=["status", "current_price", "id"]),
+            models.Index(fields=["status", "rating_average", "id"]),
+        ]
 
     def average_rating(self):
-        return self.reviews.aggregate(avg=Avg('rating'))['avg'] or 0
+        return self.rating_average
 
     def review_count(self):
-        return self.reviews.count()
+        return self.rating_count
+
+    @property
+    def rating_histogram(self):
+        return [(star, getattr(self, f"rating_{star}")) for star in range(5, 0, -1)]
 
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
+        # the admin views assign the raw POST strings; an empty discount means none
+        self.price = self._meta.get_field("price").to_python(self.price)
+        self.discount_percent = self._meta.get_field("discount_percent").to_python(self.discount_percent or 0)
+        self.is_discounted = self.discount_window_open
+        self.current_price = self.final_price
+        _skip_counter_fields(self, kwargs, Product.COUNTER_FIELDS)
         super().save(*args, **kwargs) 
         if not self.sku:
             self.sku = f"P{self.pk:06d}"
@@ -116,6 +233,10 @@ class Product(models.Model):
 
     @property
     def is_discount_active(self):
+        return self.is_discounted
+
+    @property
+    def discount_window_open(self):
         if not self.discount_percent:
             return False
         now = timezone.now()
@@ -133,7 +254,7 @@ class Product(models.Model):
         if self.discount_start and now < self.discount_start:
             return "scheduled"
         if self.discount_end and now < self.discount_end or (self.discount_end is None and self.discount_start):
-            return "active" if self.is_discount_active else "expired"
+            return "active" if self.discount_window_open else "expired"
         if self.discount_end and now > self.discount_end:
             return "expired"
         return "active"
@@ -141,17 +262,75 @@ class Product(models.Model):
     @property
     def final_price(self):
         if self.is_discount_active:
-            return (self.price * (100 - self.discount_percent) / 100).quantize(Decimal("0.01"))
+            return (self.price * (100 - self.discount_percent) / 100).quantize(Decimal("0.01"), ROUND_HALF_UP)
         return self.price
 
+class DiscountTransition(models.Model):
+    KIND_CHOICES = [
+        ("start", "Start"),
+        ("end", "End"),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="discount_transitions")
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ["at", "id"]
+
+    def __str__(self):
+        return f"{self.product} discount {self.kind} at {self.at}"
+
+class ProductRecommendation(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="recommendations")
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="recommended_in")
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["product", "rank"]
+        unique_together = ("product", "recommended")
+        indexes = [models.Index(fields=["product", "rank"])]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} ({self.score})"
+
+class ProductVariantQuerySet(models.QuerySet):
+    def with_availability(self):
+        # reserved_quantity counts every reservation row; the sweeper deletes expired
+        # ones, so the correction below only ever reads the few it hasn't reached yet
+        expired = (
+            ProductVariantReservation.objects.filter(
+                variant=OuterRef("pk"), reserved_until__lte=timezone.now()
+            )
+            .order_by()
+            .values("variant")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        )
+        return self.annotate(
+            available=ExpressionWrapper(
+                F("stock") - F("reserved_quantity")
+                + Coalesce(Subquery(expired), 0, output_field=models.IntegerField()),
+                output_field=models.IntegerField(),
+            )
+        )
+
+
 class ProductVariant(models.Model):
     SIZE_CHOICES = [("XS","XS"),("S","S"),("M","M"),("L","L"),("XL","XL"),("2XL","2XL")]
     SIZE_ORDER = {"XS":1,"S":2,"M":3,"L":4,"XL":5,"2XL":6}
+    SIZE_BITS = {size: 1 << i for i, (size, _) in enumerate(SIZE_CHOICES)}
 
     product = models.ForeignKey(Product, related_name="variants", on_delete=models.CASCADE)
     size = models.CharField(max_length=5, choices=SIZE_CHOICES)
     stock = models.PositiveIntegerField(default=0)
     size_order = models.PositiveIntegerField(editable=False)
+    # quantity held by reservation rows, moved with F() by store.signals
+    reserved_quantity = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ProductVariantQuerySet.as_manager()
 
     class Meta:
         unique_together = ("product", "size")
@@ -159,15 +338,19 @@ class ProductVariant(models.Model):
 
     def save(self, *args, **kwargs):
         self.size_order = self.SIZE_ORDER[self.size]
+        _skip_counter_fields(self, kwargs, ["reserved_quantity"])
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.product.name} - {self.size}"
 
     def available_quantity(self):
-        active_reservations = self.reservations.filter(reserved_until__gt=timezone.now())
-        reserved_sum = sum(r.quantity for r in active_reservations)
-        return self.stock - reserved_sum
+        # through the reservation backend, whose holds may live outside the database
+        from .reservations import get_reservation_backend
+
+        if "available" in self.__dict__:
+            return self.available
+        return get_reservation_backend().available_for([self.pk]).get(self.pk, 0)
 
 class ProductVariantReservation(models.Model):
     variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name="reservations")
@@ -175,7 +358,10 @@ class ProductVariantReservation(models.Model):
     session_key = models.CharField(max_length=100, null=True, blank=True)
     quantity = models.PositiveIntegerField()
     reserved_at = models.DateTimeField(auto_now_add=True)
-    reserved_until = models.DateTimeField()
+    reserved_until = models.DateTimeField(db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["variant", "reserved_until"])]
 
     def is_expired(self):
         return timezone.now() > self.reserved_until
@@ -188,6 +374,124 @@ class ProductVariantReservation(models.Model):
         owner = self.user or self.session_key
         return f"{owner} reserved {self.quantity} of {self.variant} until {self.reserved_until}"
 
+def available_for(variant_ids):
+    return dict(
+        ProductVariant.objects.filter(id__in=list(variant_ids))
+        .with_availability()
+        .values_list("id", "available")
+    )
+
+
+def apply_rating_change(product_id, added=None, removed=None):
+    # one UPDATE, so concurrent reviews can't lose each other's counts
+    delta_sum = (added or 0) - (removed or 0)
+    delta_count = (1 if added else 0) - (1 if removed else 0)
+
+    new_sum = F("rating_sum") + delta_sum
+    new_count = F("rating_count") + delta_count
+    updates = {
+        "rating_sum": new_sum,
+        "rating_count": new_count,
+        "rating_average": Case(
+            When(
+                rating_count__gt=-delta_count,
+                # rounded as numeric, half away from zero, like ROUND_HALF_UP in
+                # rebuild_rating_totals; Postgres has no round() for floats
+                then=Round(
+                    Cast(
+                        Cast(new_sum, models.FloatField()) / new_count,
+                        models.DecimalField(max_digits=12, decimal_places=8),
+                    ),
+                    2,
+                ),
+            ),
+            default=Value(Decimal("0")),
+            output_field=models.DecimalField(max_digits=3, decimal_places=2),
+        ),
+    }
+    star_deltas = defaultdict(int)
+    if added:
+        star_deltas[added] += 1
+    if removed:
+        star_deltas[removed] -= 1
+    for star, change in star_deltas.items():
+        if change:
+            updates[f"rating_{star}"] = F(f"rating_{star}") + change
+
+    Product.objects.filter(pk=product_id).update(**updates)
+
+
+def rebuild_rating_totals(product_model=None, review_model=None):
+    from accounts.models import Review
+
+    product_model = product_model or Product
+    review_model = review_model or Review
+
+    totals = review_model.objects.values("product_id").annotate(
+        total=Sum("rating"),
+        count=Count("id"),
+        **{f"stars_{star}": Count("id", filter=Q(rating=star)) for star in range(1, 6)},
+    ).order_by()
+
+    products = []
+    for row in totals:
+        product = product_model(
+            id=row["product_id"],
+            rating_sum=row["total"],
+            rating_count=row["count"],
+            # half up, as Round does in apply_rating_change
+            rating_average=(Decimal(row["total"]) / row["count"]).quantize(Decimal("0.01"), ROUND_HALF_UP),
+        )
+        for star in range(1, 6):
+            setattr(product, f"rating_{star}", row[f"stars_{star}"])
+        products.append(product)
+
+    fields = Product.RATING_COUNTER_FIELDS
+    product_model.objects.exclude(id__in=[p.id for p in products]).update(
+        **{field: 0 for field in fields}
+    )
+    product_model.objects.bulk_update(products, fields, batch_size=500)
+    return len(products)
+
+
+def size_mask_for(sizes):
+    mask = 0
+    for size in sizes:
+        mask |= ProductVariant.SIZE_BITS.get(size, 0)
+    return mask
+
+
+def size_available_condition(mask):
+    return GreaterThan(F("size_mask").bitand(mask), 0)
+
+
+def refresh_size_masks(product_ids):
+    from .reservations import get_reservation_backend
+
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    variants = list(
+        ProductVariant.objects.filter(product_id__in=product_ids, stock__gt=0)
+        .values_list("id", "product_id", "size")
+    )
+    available = get_reservation_backend().available_for([variant[0] for variant in variants])
+
+    masks = dict.fromkeys(product_ids, 0)
+    for variant_id, product_id, size in variants:
+        if available.get(variant_id, 0) > 0:
+            masks[product_id] |= ProductVariant.SIZE_BITS[size]
+
+    Product.objects.filter(id__in=product_ids).update(
+        size_mask=Case(
+            *[When(id=product_id, then=mask) for product_id, mask in masks.items()],
+            default=F("size_mask"),
+            output_field=models.PositiveSmallIntegerField(),
+        )
+    )
+
+
 def product_image_path(instance, filename):
     ext = os.path.splitext(filename)[1].lower()
     product_name = slugify(instance.product.name)
@@ -195,34 +499,112 @@ def product_image_path(instance, filename):
 
     return f"products/{product_name}/{order}/vanquished{ext}"
 
+class ProductImageQuerySet(models.QuerySet):
+    def ready(self):
+        # rows still waiting for store.images have no stored file yet
+        return self.exclude(image="")
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(
         Product,
         on_delete=models.CASCADE,
         related_name="images",
     )
-    image = models.ImageField(upload_to=product_image_path)
+    # empty until store.images has moved the staged upload to the media storage
+    image = models.ImageField(upload_to=product_image_path, blank=True)
     order = models.PositiveSmallIntegerField(default=0)
+    staged_name = models.CharField(max_length=255, blank=True, editable=False)
+    # {"thumb"|"card"|"zoom": {"name", "url", "width"}}, WebP, see store.images.RENDITIONS
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+    # image.url, resolved once per file; the media storage builds it in Python on every call
+    image_url = models.CharField(max_length=500, blank=True, editable=False)
+
+    objects = ProductImageQuerySet.as_manager()
 
     class Meta:
         ordering = ["order"]
-    
-    def delete(self, *args, **kwargs):
-            if self.image:
-                self.image.delete(save=False)
-            super().delete(*args, **kwargs)
 
-    
+    def rendition_url(self, kind):
+        if kind in self.renditions:
+            return self.renditions[kind]["url"]
+        return self.url
+
+    @property
+    def url(self):
+        return self.image_url
+
+    @property
+    def thumb_url(self):
+        return self.rendition_url("thumb")
+
+    @property
+    def card_url(self):
+        return self.rendition_url("card")
+
+    @property
+    def zoom_url(self):
+        return self.rendition_url("zoom")
+
+    @property
+    def srcset(self):
+        # a small original gives several renditions of the same width; one per width is enough
+        widths = {rendition["width"]: rendition["url"] for rendition in self.renditions.values()}
+        return ", ".join(f"{widths[width]} {width}w" for width in sorted(widths))
+
+    @property
+    def file_names(self):
+        # every stored file behind this row
+        names = {rendition["name"] for rendition in self.renditions.values()}
+        if self.image:
+            names.add(self.image.name)
+        return names
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # files replaced by a save are queued for deletion, see store.signals
+        if "image" in field_names and "renditions" in field_names:
+            instance._loaded_file_names = instance.file_names
+        return instance
+
     def save(self, *args, **kwargs):
-        try:
-            old = ProductImage.objects.get(pk=self.pk)
-            if old.image and old.image != self.image:
-                old.image.delete(save=False)
-        except ProductImage.DoesNotExist:
-            pass
-
-        super().save(*args, **kwargs)   
-    
+        # a new upload is stored first (what Model.save would do anyway) so its final name is known
+        self._meta.get_field("image").pre_save(self, self._state.adding)
+        name = self.image.name if self.image else ""
+        loaded = getattr(self, "_loaded_file_names", set())
+        if not self.image_url or name not in loaded:
+            self.image_url = self.image.url if name else ""
+            changed = ["image_url"]
+            # a new source (e.g. replaced in the admin) whose renditions are still the old ones;
+            # store.images builds new ones and sets them together with the source
+            if name and name not in loaded and all(r["name"] in loaded for r in self.renditions.values()):
+                self.renditions = {}
+                self._needs_renditions = True
+                changed.append("renditions")
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "image" in update_fields:
+                kwargs["update_fields"] = [*update_fields, *changed]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.product.name} [{self.order}]"
-    
+
+
+class StorageDeletion(models.Model):
+    # A stored file to remove. Rows are written in the transaction that drops
+    # the reference and drained in batches by store.tasks.drain_storage_deletions.
+    name = models.CharField(max_length=500)
+    # in the upload staging area (store.images), not the media storage
+    staged = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["next_attempt_at"]
+        indexes = [models.Index(fields=["attempts", "next_attempt_at"])]
+
+    def __str__(self):
+        return self.name
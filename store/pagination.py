@@ -0,0 +1,186 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def _encode_value(value):
+    if value is None:
+        return ["n", None]
+    if isinstance(value, bool):
+        return ["b", value]
+    if isinstance(value, Decimal):
+        return ["d", str(value)]
+    if isinstance(value, datetime):
+        return ["t", value.isoformat()]
+    if isinstance(value, date):
+        return ["D", value.isoformat()]
+    if isinstance(value, float):
+        return ["f", value]
+    if isinstance(value, int):
+        return ["i", value]
+    return ["s", str(value)]
+
+
+def _decode_value(kind, raw):
+    if kind == "n":
+        return None
+    if kind == "d":
+        return Decimal(raw)
+    if kind == "t":
+        return datetime.fromisoformat(raw)
+    if kind == "D":
+        return date.fromisoformat(raw)
+    if kind == "f":
+        return float(raw)
+    if kind == "i":
+        return int(raw)
+    if kind == "b":
+        return bool(raw)
+    return str(raw)
+
+
+def encode_cursor(values, direction):
+    payload = {"v": [_encode_value(v) for v in values], "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(kind, raw) for kind, raw in payload["v"]]
+        direction = payload["d"]
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidOperation):
+        return None, None
+
+    if len(values) != size or direction not in ("next", "prev"):
+        return None, None
+    return values, direction
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+# Keyset pagination over the queryset's own ordering. The primary key is
+# appended as a tie-breaker; ordering keys must be non-null.
+class CursorPaginator:
+    def __init__(self, queryset, per_page):
+        self.per_page = per_page
+        self.ordering = self._ordering(queryset)
+        self.fields = [self._field(queryset, name) for name, _ in self.ordering]
+        self.queryset = queryset
+
+    def _ordering(self, queryset):
+        fields = list(queryset.query.order_by or queryset.model._meta.ordering)
+        ordering = []
+        for field in fields:
+            if not isinstance(field, str):
+                raise ValueError("CursorPaginator only supports field-name ordering.")
+            descending = field.startswith("-")
+            name = field.lstrip("-")
+            if name == "pk":
+                name = queryset.model._meta.pk.name
+            ordering.append((name, descending))
+
+        pk = queryset.model._meta.pk.name
+        if pk not in (name for name, _ in ordering):
+            last_descending = ordering[-1][1] if ordering else True
+            ordering.append((pk, last_descending))
+        return ordering
+
+    def _field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        model = queryset.model
+        *path, last = name.split("__")
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(last)
+
+    def _clean(self, values):
+        # a well-formed cursor from another ordering (or edited by hand) starts
+        # over at the first page instead of failing in the query
+        try:
+            values = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (ValidationError, TypeError):
+            return None
+        if any(value is None for value in values):
+            return None
+        return values
+
+    def _values(self, obj):
+        return [getattr(obj, name) for name, _ in self.ordering]
+
+    def _seek(self, values, forward):
+        # (a, b, id) > (x, y, z) spelled out as a OR of equality prefixes
+        condition = Q()
+        for i, (name, descending) in enumerate(self.ordering):
+            step = Q(**{f"{name}__{'lt' if descending == forward else 'gt'}": values[i]})
+            for j in range(i):
+                step &= Q(**{self.ordering[j][0]: values[j]})
+            condition |= step
+        return condition
+
+    def _order_by(self, forward):
+        return [
+            f"{'-' if descending == forward else ''}{name}"
+            for name, descending in self.ordering
+        ]
+
+    def get_page(self, cursor=None):
+        values, direction = decode_cursor(cursor, len(self.ordering)) if cursor else (None, None)
+        if values is not None:
+            values = self._clean(values)
+            if values is None:
+                direction = None
+        forward = direction != "prev"
+
+        qs = self.queryset.order_by(*self._order_by(forward))
+        if values is not None:
+            qs = qs.filter(self._seek(values, forward))
+
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage([])
+
+        has_next = has_more if forward else True
+        has_previous = values is not None if forward else has_more
+
+        return CursorPage(
+            rows,
+            next_cursor=encode_cursor(self._values(rows[-1]), "next") if has_next else None,
+            previous_cursor=encode_cursor(self._values(rows[0]), "prev") if has_previous else None,
+        )
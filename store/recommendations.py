@@ -0,0 +1,137 @@
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import RELATED_VERSION, bump_version
+from .models import Product, ProductRecommendation
+
+CATEGORY_WEIGHT = 5
+TAG_WEIGHT = 1
+
+
+def _stored_per_product():
+    # more than the page shows, so manual picks can be skipped without running dry
+    return getattr(settings, "RELATED_PRODUCTS_STORED", 30)
+
+
+def _load_catalog():
+    # sparse product x tag / product x category incidence, in two queries; full rebuilds only
+    product_tags = defaultdict(list)
+    tag_products = defaultdict(list)
+    for product_id, tag_id in Product.tags.through.objects.values_list("product_id", "tag_id"):
+        product_tags[product_id].append(tag_id)
+
+    active = set()
+    product_category = {}
+    category_products = defaultdict(list)
+    for product_id, category_id, status in Product.objects.values_list("id", "category_id", "status"):
+        product_category[product_id] = category_id
+        if status == "active":
+            active.add(product_id)
+            if category_id:
+                category_products[category_id].append(product_id)
+
+    for product_id, tag_ids in product_tags.items():
+        if product_id in active:
+            for tag_id in tag_ids:
+                tag_products[tag_id].append(product_id)
+
+    return product_tags, product_category, tag_products, category_products
+
+
+def score_products(source_ids, catalog, limit):
+    product_tags, product_category, tag_products, category_products = catalog
+    results = {}
+
+    for source_id in source_ids:
+        scores = defaultdict(int)
+        for tag_id in product_tags.get(source_id, ()):
+            for product_id in tag_products[tag_id]:
+                scores[product_id] += TAG_WEIGHT
+        category_id = product_category.get(source_id)
+        if category_id:
+            for product_id in category_products[category_id]:
+                scores[product_id] += CATEGORY_WEIGHT
+        scores.pop(source_id, None)
+
+        results[source_id] = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+
+    return results
+
+
+def _load_neighbourhood(product_ids):
+    # The incremental path: the changed products, every source whose ranking
+    # they can touch, and only the candidates those sources can score.
+    Link = Product.tags.through
+    changed = dict(Product.objects.filter(id__in=product_ids).values_list("id", "category_id"))
+    changed_tags = set(Link.objects.filter(product_id__in=changed).values_list("tag_id", flat=True))
+    changed_categories = {category_id for category_id in changed.values() if category_id}
+
+    sources = set(changed)
+    sources.update(
+        Link.objects.filter(tag_id__in=changed_tags, product__status="active").values_list("product_id", flat=True)
+    )
+    sources.update(
+        Product.objects.filter(category_id__in=changed_categories, status="active").values_list("id", flat=True)
+    )
+    # products that used to recommend them, in case they no longer should
+    sources.update(
+        ProductRecommendation.objects.filter(recommended_id__in=product_ids)
+        .values_list("product_id", flat=True)
+    )
+
+    product_category = dict(Product.objects.filter(id__in=sources).values_list("id", "category_id"))
+    product_tags = defaultdict(list)
+    for product_id, tag_id in Link.objects.filter(product_id__in=product_category).values_list("product_id", "tag_id"):
+        product_tags[product_id].append(tag_id)
+
+    tag_products = defaultdict(list)
+    source_tags = {tag_id for tag_ids in product_tags.values() for tag_id in tag_ids}
+    for tag_id, product_id in Link.objects.filter(
+        tag_id__in=source_tags, product__status="active"
+    ).values_list("tag_id", "product_id"):
+        tag_products[tag_id].append(product_id)
+
+    category_products = defaultdict(list)
+    source_categories = {category_id for category_id in product_category.values() if category_id}
+    for category_id, product_id in Product.objects.filter(
+        category_id__in=source_categories, status="active"
+    ).values_list("category_id", "id"):
+        category_products[category_id].append(product_id)
+
+    return set(product_category), (product_tags, product_category, tag_products, category_products)
+
+
+def refresh_related_products(product_ids=None):
+    if product_ids is None:
+        catalog = _load_catalog()
+        sources = set(catalog[1])
+    else:
+        sources, catalog = _load_neighbourhood(set(product_ids))
+
+    results = score_products(sources, catalog, _stored_per_product())
+    rows = [
+        ProductRecommendation(product_id=source_id, recommended_id=product_id, score=score, rank=rank)
+        for source_id, ranked in results.items()
+        for rank, (product_id, score) in enumerate(ranked)
+    ]
+
+    with transaction.atomic():
+        if product_ids is None:
+            ProductRecommendation.objects.all().delete()
+        else:
+            ProductRecommendation.objects.filter(product_id__in=sources).delete()
+        ProductRecommendation.objects.bulk_create(rows, batch_size=1000)
+
+    bump_version(RELATED_VERSION)
+    return len(sources)
+
+
+def schedule_related_refresh(product_ids):
+    from .tasks import refresh_related_products_task
+
+    product_ids = list(product_ids)
+    if product_ids:
+        transaction.on_commit(lambda: refresh_related_products_task.delay(product_ids))
@@ -0,0 +1,74 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import bump_version, get_version
+
+REFERENCE_VERSION = "reference"
+REFERENCE_KEY = "store:reference:{}:{}"
+
+
+def _load_categories():
+    from .models import Category
+    return list(Category.objects.all())
+
+
+def _load_tags():
+    from .models import Tag
+    return list(Tag.objects.all())
+
+
+LOADERS = {
+    "categories": _load_categories,
+    "tags": _load_tags,
+}
+
+
+# Categories and tags rarely change, so each worker keeps its own copy and
+# only asks the shared cache which version is current. A miss falls back to
+# the shared cache before going to the database.
+class ReferenceCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = {}    # name -> (version, rows)
+
+    def get(self, name):
+        version = get_version(REFERENCE_VERSION)
+        local = self._local.get(name)
+        if local and local[0] == version:
+            return list(local[1])
+
+        key = REFERENCE_KEY.format(version, name)
+        rows = cache.get(key)
+        if rows is None:
+            rows = LOADERS[name]()
+            cache.set(key, rows, getattr(settings, "REFERENCE_CACHE_TIMEOUT", 60 * 60 * 24))
+
+        with self._lock:
+            self._local[name] = (version, rows)
+        return list(rows)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+
+reference_cache = ReferenceCache()
+
+
+def get_categories():
+    return reference_cache.get("categories")
+
+
+def get_tags():
+    return reference_cache.get("tags")
+
+
+def get_category_by_slug(slug):
+    return next((c for c in get_categories() if c.slug == slug), None)
+
+
+def invalidate_reference_data():
+    transaction.on_commit(lambda: bump_version(REFERENCE_VERSION))
@@ -0,0 +1,501 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .cache import bump_product_sizes_versions
+from .models import ProductVariant, ProductVariantReservation, available_for, refresh_size_masks
+from .stock import commit_stock
+
+DEFAULT_BACKEND = "store.reservations.DatabaseReservationBackend"
+EXPIRE_BATCH_SIZE = 500
+EXPIRE_PAUSE = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+def reservation_owner(user=None, session_key=None):
+    if user is not None:
+        return f"user:{user.pk}"
+    return f"session:{session_key}"
+
+
+def _ttl(ttl):
+    return ttl or getattr(settings, "RESERVATION_TTL", 5 * 60)
+
+
+def _delete_rows(model, ids):
+    # A plain DELETE, skipping the per-row delete signals (a SELECT plus three
+    # UPDATEs per reservation); the caller settles the counters per chunk.
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", ids)
+
+
+def release_reserved_counts(released):
+    # {variant_id: quantity} off reserved_quantity in one statement
+    if not released:
+        return
+    ProductVariant.objects.filter(id__in=released).update(
+        reserved_quantity=Greatest(
+            F("reserved_quantity") - Case(
+                *[When(id=variant_id, then=Value(quantity)) for variant_id, quantity in released.items()],
+                default=Value(0),
+            ),
+            0,
+        )
+    )
+    refresh_variant_availability(released)
+
+
+def refresh_variant_availability(variant_ids):
+    # size masks and size pickers of the products whose holds changed
+    product_ids = set(
+        ProductVariant.objects.filter(id__in=list(variant_ids)).values_list("product_id", flat=True)
+    )
+    refresh_size_masks(product_ids)
+    bump_product_sizes_versions(product_ids)
+
+
+# A backend holds stock for an owner ("user:<id>" or "session:<key>") while
+# they pay. lines are {variant_id: quantity}.
+#   reserve  - all lines or nothing; replaces the owner's earlier holds on them
+#   release  - drops every hold of the owner
+#   confirm  - consumes the owner's holds that cover the given lines and takes
+#              that stock off ProductVariant; returns what was confirmed
+#   available_for - sellable quantity per variant, less every hold but owner's
+#   expire   - drops lapsed holds, for stores without native expiry, and gives
+#              their stock back to the size masks
+class ReservationBackend:
+    def reserve(self, owner, lines, ttl=None):
+        raise NotImplementedError
+
+    def release(self, owner):
+        raise NotImplementedError
+
+    def confirm(self, owner, lines):
+        raise NotImplementedError
+
+    def available_for(self, variant_ids, owner=None):
+        raise NotImplementedError
+
+    def expire(self):
+        return 0
+
+
+# ---------------------------
+# DATABASE
+# ---------------------------
+class DatabaseReservationBackend(ReservationBackend):
+    def _owner_filter(self, owner):
+        kind, _, value = owner.partition(":")
+        if kind == "user":
+            return Q(user_id=value)
+        return Q(session_key=value, user__isnull=True)
+
+    def _owner_fields(self, owner):
+        kind, _, value = owner.partition(":")
+        return {"user_id": value} if kind == "user" else {"session_key": value}
+
+    def reserve(self, owner, lines, ttl=None):
+        lines = {variant_id: quantity for variant_id, quantity in lines.items() if quantity > 0}
+        if not lines:
+            return True
+
+        reserved_until = timezone.now() + timedelta(seconds=_ttl(ttl))
+        with transaction.atomic():
+            # id order, so concurrent checkouts take the locks in the same sequence
+            list(ProductVariant.objects.select_for_update().filter(id__in=lines).order_by("id").values_list("id"))
+            ProductVariantReservation.objects.filter(self._owner_filter(owner), variant_id__in=lines).delete()
+
+            available = available_for(lines)
+            if any(available.get(variant_id, 0) < quantity for variant_id, quantity in lines.items()):
+                transaction.set_rollback(True)
+                return False
+
+            for variant_id, quantity in lines.items():
+                ProductVariantReservation.objects.create(
+                    variant_id=variant_id,
+                    quantity=quantity,
+                    reserved_until=reserved_until,
+                    **self._owner_fields(owner),
+                )
+        return True
+
+    def release(self, owner):
+        ProductVariantReservation.objects.filter(self._owner_filter(owner)).delete()
+
+    def confirm(self, owner, lines):
+        with transaction.atomic():
+            held = defaultdict(int)
+            active = ProductVariantReservation.objects.select_for_update().filter(
+                self._owner_filter(owner), reserved_until__gt=timezone.now()
+            )
+            for variant_id, quantity in active.values_list("variant_id", "quantity"):
+                held[variant_id] += quantity
+
+            covered = {
+                variant_id: quantity for variant_id, quantity in lines.items()
+                if quantity > 0 and held[variant_id] >= quantity
+            }
+            self.release(owner)
+            return commit_stock(covered, partial=True).committed
+
+    def available_for(self, variant_ids, owner=None):
+        available = available_for(variant_ids)
+        if owner:
+            own = ProductVariantReservation.objects.filter(
+                self._owner_filter(owner), variant_id__in=available, reserved_until__gt=timezone.now()
+            )
+            for variant_id, quantity in own.values_list("variant_id", "quantity"):
+                available[variant_id] += quantity
+        return available
+
+    def expire(self, batch_size=EXPIRE_BATCH_SIZE, pause=EXPIRE_PAUSE):
+        # bounded chunks through the reserved_until index, pausing in between,
+        # so a burst of abandoned checkouts never holds the table for long
+        started = time.monotonic()
+        now = timezone.now()
+        expired = batches = 0
+
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    ProductVariantReservation.objects.select_for_update(skip_locked=True)
+                    .filter(reserved_until__lte=now)
+                    .order_by("reserved_until")
+                    .values_list("id", "variant_id", "quantity")[:batch_size]
+                )
+                if not rows:
+                    break
+
+                released = defaultdict(int)
+                for _, variant_id, quantity in rows:
+                    released[variant_id] += quantity
+
+                _delete_rows(ProductVariantReservation, [row[0] for row in rows])
+                release_reserved_counts(released)
+
+            expired += len(rows)
+            batches += 1
+            if len(rows) < batch_size:
+                break
+            time.sleep(pause)
+
+        logger.info(
+            "Expired %d reservations in %d batches (%.3fs)", expired, batches, time.monotonic() - started
+        )
+        return expired
+
+
+# ---------------------------
+# REDIS
+# ---------------------------
+# Per variant, a sorted set of owners scored by expiry and a hash of their
+# quantities; per owner, a hash of the variants they hold. Every key a script
+# touches is passed in KEYS, and all of them share one hash tag, so the
+# scripts also run on a cluster.
+
+RESERVE_SCRIPT = """
+-- KEYS: owner hash, z/q per variant, expiry index; ARGV: now, expiry, ttl, owner, then variant/quantity/stock
+local now, expiry, ttl, owner = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[4]
+local count = (#KEYS - 2) / 2
+
+for i = 1, count do
+  local zkey, hkey = KEYS[i * 2], KEYS[i * 2 + 1]
+  local quantity, stock = tonumber(ARGV[3 + i * 3]), tonumber(ARGV[4 + i * 3])
+  local expired = redis.call('ZRANGEBYSCORE', zkey, '-inf', now)
+  if #expired > 0 then
+    redis.call('ZREMRANGEBYSCORE', zkey, '-inf', now)
+    redis.call('HDEL', hkey, unpack(expired))
+  end
+  local held = 0
+  local quantities = redis.call('HGETALL', hkey)
+  for j = 1, #quantities, 2 do
+    if quantities[j] ~= owner then held = held + tonumber(quantities[j + 1]) end
+  end
+  if stock - held < quantity then return 0 end
+end
+
+for i = 1, count do
+  local zkey, hkey = KEYS[i * 2], KEYS[i * 2 + 1]
+  local variant, quantity = ARGV[2 + i * 3], ARGV[3 + i * 3]
+  redis.call('ZADD', zkey, expiry, owner)
+  redis.call('HSET', hkey, owner, quantity)
+  redis.call('PEXPIRE', zkey, ttl)
+  redis.call('PEXPIRE', hkey, ttl)
+  redis.call('HSET', KEYS[1], variant, quantity)
+  redis.call('ZADD', KEYS[#KEYS], expiry, variant)
+end
+redis.call('PEXPIRE', KEYS[1], ttl)
+return 1
+"""
+
+RELEASE_SCRIPT = """
+-- KEYS: owner hash, then z/q per variant it held when read; ARGV: owner, then those variants.
+-- -1 if the owner's holds changed since, so the caller reads them again.
+local owner = ARGV[1]
+local expected = {}
+for i = 2, #ARGV do expected[ARGV[i]] = true end
+local held = redis.call('HKEYS', KEYS[1])
+if #held ~= #ARGV - 1 then return -1 end
+for _, variant in ipairs(held) do
+  if not expected[variant] then return -1 end
+end
+for i = 2, #KEYS, 2 do
+  redis.call('ZREM', KEYS[i], owner)
+  redis.call('HDEL', KEYS[i + 1], owner)
+end
+redis.call('DEL', KEYS[1])
+return #held
+"""
+
+COVERED_SCRIPT = """
+-- KEYS: z/q per variant; ARGV: owner, now, then variant/quantity
+local owner, now = ARGV[1], tonumber(ARGV[2])
+local covered = {}
+for i = 1, #KEYS / 2 do
+  local variant, quantity = ARGV[1 + i * 2], tonumber(ARGV[2 + i * 2])
+  local expiry = redis.call('ZSCORE', KEYS[i * 2 - 1], owner)
+  local held = tonumber(redis.call('HGET', KEYS[i * 2], owner) or '0')
+  if expiry and tonumber(expiry) > now and held >= quantity then
+    table.insert(covered, variant)
+    table.insert(covered, quantity)
+  end
+end
+return covered
+"""
+
+LAPSED_SCRIPT = """
+-- KEYS: expiry index; ARGV: now. Variants whose latest hold has lapsed, taken off the index.
+local lapsed = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if #lapsed > 0 then
+  redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+end
+return lapsed
+"""
+
+HELD_SCRIPT = """
+-- KEYS: z/q per variant; ARGV: now, owner whose holds don't count
+local now, owner = tonumber(ARGV[1]), ARGV[2]
+local totals = {}
+for i = 1, #KEYS / 2 do
+  local owners = redis.call('ZRANGEBYSCORE', KEYS[i * 2 - 1], '(' .. now, '+inf')
+  local held = 0
+  if #owners > 0 then
+    local quantities = redis.call('HMGET', KEYS[i * 2], unpack(owners))
+    for j, quantity in ipairs(quantities) do
+      if owners[j] ~= owner then held = held + tonumber(quantity or '0') end
+    end
+  end
+  table.insert(totals, held)
+end
+return totals
+"""
+
+
+class RedisReservationBackend(ReservationBackend):
+    prefix = "reservations:{stock}:"
+
+    def __init__(self, client=None, url=None, clock=time.time):
+        self.clock = clock
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or settings.RESERVATION_REDIS_URL)
+        self.client = client
+        self.scripts = {
+            name: client.register_script(source)
+            for name, source in (
+                ("reserve", RESERVE_SCRIPT),
+                ("release", RELEASE_SCRIPT),
+                ("covered", COVERED_SCRIPT),
+                ("held", HELD_SCRIPT),
+                ("lapsed", LAPSED_SCRIPT),
+            )
+        }
+
+    def _now_ms(self):
+        return int(self.clock() * 1000)
+
+    def _owner_key(self, owner):
+        return f"{self.prefix}o:{owner}"
+
+    def _variant_keys(self, variant_id):
+        return [f"{self.prefix}z:{variant_id}", f"{self.prefix}q:{variant_id}"]
+
+    def _expiry_key(self):
+        return f"{self.prefix}expiring"
+
+    def _held_variants(self, owner):
+        return [variant.decode() for variant in self.client.hkeys(self._owner_key(owner))]
+
+    def _run(self, name, keys, args):
+        return self.scripts[name](keys=keys, args=args)
+
+    def reserve(self, owner, lines, ttl=None):
+        lines = {variant_id: quantity for variant_id, quantity in lines.items() if quantity > 0}
+        if not lines:
+            return True
+
+        # holds are checked against the committed stock; confirm re-checks it in the database
+        stock = dict(ProductVariant.objects.filter(id__in=lines).values_list("id", "stock"))
+        ttl_ms = _ttl(ttl) * 1000
+        now = self._now_ms()
+        keys, args = [self._owner_key(owner)], [now, now + ttl_ms, ttl_ms, owner]
+        for variant_id, quantity in sorted(lines.items()):
+            keys += self._variant_keys(variant_id)
+            args += [variant_id, quantity, stock.get(variant_id, 0)]
+        keys.append(self._expiry_key())
+        if not self._run("reserve", keys, args):
+            return False
+        refresh_variant_availability(lines)
+        return True
+
+    def release(self, owner):
+        while True:
+            variants = self._held_variants(owner)
+            keys = [self._owner_key(owner)]
+            for variant in variants:
+                keys += self._variant_keys(variant)
+            if self._run("release", keys, [owner, *variants]) != -1:
+                break
+        refresh_variant_availability([int(variant) for variant in variants])
+
+    def confirm(self, owner, lines):
+        lines = sorted((variant_id, quantity) for variant_id, quantity in lines.items() if quantity > 0)
+        keys, args = [], [owner, self._now_ms()]
+        for variant_id, quantity in lines:
+            keys += self._variant_keys(variant_id)
+            args += [variant_id, quantity]
+        flat = self._run("covered", keys, args)
+        covered = {int(flat[i]): int(flat[i + 1]) for i in range(0, len(flat), 2)}
+
+        committed = commit_stock(covered, partial=True, owner=owner).committed
+        # The holds go only once the stock is taken for good. If the caller's
+        # transaction rolls back they are still there for its retry.
+        transaction.on_commit(lambda: self.release(owner))
+        return committed
+
+    def available_for(self, variant_ids, owner=None):
+        variant_ids = sorted(set(variant_ids))
+        if not variant_ids:
+            return {}
+        available = available_for(variant_ids)
+        keys = [key for variant_id in variant_ids for key in self._variant_keys(variant_id)]
+        held = self._run("held", keys, [self._now_ms(), owner or ""])
+        return {
+            variant_id: available[variant_id] - int(quantity)
+            for variant_id, quantity in zip(variant_ids, held)
+            if variant_id in available
+        }
+
+    def expire(self):
+        # Redis drops lapsed holds itself; this only gives their stock back to
+        # the size masks and size pickers
+        lapsed = [int(variant) for variant in self._run("lapsed", [self._expiry_key()], [self._now_ms()])]
+        refresh_variant_availability(lapsed)
+        return len(lapsed)
+
+
+# ---------------------------
+# IN-PROCESS FAKE
+# ---------------------------
+class InMemoryReservationBackend(RedisReservationBackend):
+    # same semantics as the Lua scripts, for tests and single-process development
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._holds = defaultdict(dict)     # variant -> owner -> (quantity, expiry_ms)
+        self._owners = defaultdict(dict)    # owner -> variant -> quantity
+        self._expiring = {}                 # variant -> latest expiry_ms
+
+    def _drop_owner(self, owner):
+        for variant in self._owners.pop(owner, {}):
+            self._holds[variant].pop(owner, None)
+
+    def _held_variants(self, owner):
+        return list(self._owners.get(owner, {}))
+
+    def _run(self, name, keys, args):
+        with self._lock:
+            return getattr(self, f"_{name}")(keys, args)
+
+    def _reserve(self, keys, args):
+        now, expiry, _, owner = args[:4]
+        lines = [args[i:i + 3] for i in range(4, len(args), 3)]
+
+        for variant, quantity, stock in lines:
+            holds = self._holds[str(variant)]
+            for other, (_, until) in list(holds.items()):
+                if until <= now:
+                    del holds[other]
+            held = sum(q for other, (q, _) in holds.items() if other != owner)
+            if stock - held < quantity:
+                return 0
+
+        for variant, quantity, _ in lines:
+            self._holds[str(variant)][owner] = (quantity, expiry)
+            self._owners[owner][str(variant)] = quantity
+            self._expiring[str(variant)] = expiry
+        return 1
+
+    def _release(self, keys, args):
+        owner, variants = args[0], args[1:]
+        if set(variants) != set(self._owners.get(owner, {})):
+            return -1
+        self._drop_owner(owner)
+        return len(variants)
+
+    def _covered(self, keys, args):
+        owner, now = args[:2]
+        covered = []
+        for i in range(2, len(args), 2):
+            variant, quantity = args[i], args[i + 1]
+            held, until = self._holds[str(variant)].get(owner, (0, 0))
+            if until > now and held >= quantity:
+                covered += [variant, quantity]
+        return covered
+
+    def _lapsed(self, keys, args):
+        now = args[0]
+        lapsed = [variant for variant, until in self._expiring.items() if until <= now]
+        for variant in lapsed:
+            del self._expiring[variant]
+        return lapsed
+
+    def _held(self, keys, args):
+        now, owner = args[:2]
+        variants = [key.rsplit(":", 1)[1] for key in keys[::2]]
+        return [
+            sum(q for other, (q, until) in self._holds[variant].items() if until > now and other != owner)
+            for variant in variants
+        ]
+
+
+_backend = None
+
+
+def get_reservation_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(getattr(settings, "RESERVATION_BACKEND", DEFAULT_BACKEND))()
+    return _backend
+
+
+def load_availability(variants, owner=None):
+    # loaded variants with .available set, less every hold the backend knows of
+    variants = list(variants)
+    available = get_reservation_backend().available_for([variant.pk for variant in variants], owner=owner)
+    for variant in variants:
+        variant.available = available.get(variant.pk, 0)
+    return variants
@@ -0,0 +1,165 @@
+import re
+
+from django.db import connection as default_connection, connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = "store_product_search"
+TOKEN_RE = re.compile(r"\w+")
+MAX_QUERY_TOKENS = 8
+BATCH_SIZE = 500
+
+# name, tags, category, sku
+SQLITE_WEIGHTS = (10.0, 4.0, 2.0, 10.0)
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())[:MAX_QUERY_TOKENS]
+
+
+# ---------------------------
+# DOCUMENTS
+# ---------------------------
+def _document_rows(product_model, product_ids=None):
+    qs = product_model.objects.select_related("category").prefetch_related("tags").order_by("id")
+    if product_ids is not None:
+        qs = qs.filter(id__in=product_ids)
+
+    for p in qs.iterator(chunk_size=BATCH_SIZE):
+        yield (
+            p.id,
+            p.name or "",
+            " ".join(t.name for t in p.tags.all()),
+            p.category.name if p.category else "",
+            p.sku or "",
+        )
+
+
+def _write_rows(cursor, vendor, rows):
+    if vendor == "postgresql":
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (product_id, document) VALUES (%s, "
+            "setweight(to_tsvector('simple', %s), 'A') || "
+            "setweight(to_tsvector('simple', %s), 'B') || "
+            "setweight(to_tsvector('simple', %s), 'C') || "
+            "setweight(to_tsvector('simple', %s), 'A'))",
+            rows,
+        )
+    else:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, tags, category, sku) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def _delete_rows(cursor, vendor, product_ids):
+    key = "product_id" if vendor == "postgresql" else "rowid"
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE {key} IN ({placeholders})", product_ids)
+
+
+def delete_search_documents(product_ids, connection=None):
+    connection = connection or default_connection
+    vendor = connection.vendor
+    product_ids = list(product_ids)
+    if vendor not in ("postgresql", "sqlite") or not product_ids:
+        return
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            _delete_rows(cursor, vendor, product_ids[start:start + BATCH_SIZE])
+
+
+def refresh_search_documents(product_ids, product_model=None, connection=None):
+    from .models import Product
+
+    connection = connection or default_connection
+    vendor = connection.vendor
+    product_ids = list(product_ids)
+    if vendor not in ("postgresql", "sqlite") or not product_ids:
+        return
+
+    product_model = product_model or Product
+    with connection.cursor() as cursor:
+        for start in range(0, len(product_ids), BATCH_SIZE):
+            chunk = product_ids[start:start + BATCH_SIZE]
+            _delete_rows(cursor, vendor, chunk)
+            _write_rows(cursor, vendor, list(_document_rows(product_model, chunk)))
+
+
+def rebuild_search_index(product_model=None, connection=None):
+    from .models import Product
+
+    connection = connection or default_connection
+    vendor = connection.vendor
+    if vendor not in ("postgresql", "sqlite"):
+        return 0
+
+    product_model = product_model or Product
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        batch = []
+        for row in _document_rows(product_model):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                _write_rows(cursor, vendor, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            _write_rows(cursor, vendor, batch)
+            count += len(batch)
+    return count
+
+
+# ---------------------------
+# QUERYING
+# ---------------------------
+def search_products(queryset, query):
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+
+    if vendor == "postgresql":
+        tsquery = " & ".join(f"{t}:*" for t in tokens)
+        matches = RawSQL(
+            f"SELECT product_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', %s)",
+            (tsquery,),
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank_cd(document, to_tsquery('simple', %s)) FROM {SEARCH_TABLE} "
+            "WHERE product_id = store_product.id",
+            (tsquery,),
+            output_field=FloatField(),
+        )
+    elif vendor == "sqlite":
+        match = " ".join(f'"{t}"*' for t in tokens)
+        weights = ", ".join(str(w) for w in SQLITE_WEIGHTS)
+        matches = RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+            (match,),
+        )
+        rank = RawSQL(
+            f"SELECT -bm25({SEARCH_TABLE}, {weights}) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rowid = store_product.id",
+            (match,),
+            output_field=FloatField(),
+        )
+    else:
+        condition = Q()
+        for token in tokens:
+            condition &= (
+                Q(name__icontains=token)
+                | Q(tags__name__icontains=token)
+                | Q(sku__icontains=token)
+            )
+        return queryset.filter(condition).distinct()
+
+    return (
+        queryset.filter(id__in=matches)
+        .annotate(search_rank=rank)
+        .order_by("-search_rank", "-id")
+    )
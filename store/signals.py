@@ -0,0 +1,262 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from accounts.models import Review
+
+from .cache import RELATED_VERSION, bump_product_sizes_versions, bump_product_versions, bump_version
+from .facets import FACETS_VERSION
+from .images import schedule_processing
+from .models import (
+    Category,
+    Product,
+    ProductImage,
+    ProductVariant,
+    ProductVariantReservation,
+    Tag,
+    refresh_size_masks,
+)
+from .discounts import schedule_discounts
+from .recommendations import schedule_related_refresh
+from .reference import invalidate_reference_data
+from .search import delete_search_documents, refresh_search_documents
+from .storage_cleanup import queue_deletions
+from .suggestions import mark_products_changed
+
+
+def _affected_product_ids(instance):
+    return getattr(instance, "_affected_product_ids", [])
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Category)
+def remember_affected_products(sender, instance, **kwargs):
+    related = instance.product_set if sender is Tag else instance.products
+    instance._affected_product_ids = list(related.values_list("id", flat=True))
+
+
+# ---------------------------
+# SEARCH INDEX
+# ---------------------------
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    refresh_search_documents([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    delete_search_documents([instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def index_product_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh_search_documents([instance.pk])
+            mark_products_changed([instance.pk])
+        return
+
+    # tag.product_set changes: pk_set holds product ids
+    if action == "pre_clear":
+        instance._affected_product_ids = list(instance.product_set.values_list("id", flat=True))
+    elif action == "post_clear":
+        refresh_search_documents(_affected_product_ids(instance))
+        mark_products_changed(_affected_product_ids(instance))
+    elif action in ("post_add", "post_remove"):
+        refresh_search_documents(pk_set or [])
+        mark_products_changed(pk_set or [])
+
+
+@receiver(post_save, sender=Tag)
+def index_tag_products(sender, instance, created, **kwargs):
+    if not created:
+        product_ids = list(instance.product_set.values_list("id", flat=True))
+        refresh_search_documents(product_ids)
+        mark_products_changed(product_ids)
+
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(instance.products.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def reindex_orphaned_products(sender, instance, **kwargs):
+    refresh_search_documents(_affected_product_ids(instance))
+    if sender is Tag:
+        mark_products_changed(_affected_product_ids(instance))
+
+
+# ---------------------------
+# SUGGESTIONS
+# ---------------------------
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_product_suggestions(sender, instance, **kwargs):
+    mark_products_changed([instance.pk])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_image_suggestions(sender, instance, **kwargs):
+    mark_products_changed([instance.product_id])
+
+
+# ---------------------------
+# RELATED PRODUCTS
+# ---------------------------
+@receiver(post_save, sender=Product)
+def rescore_product(sender, instance, created, **kwargs):
+    if created or getattr(instance, "_loaded_scoring_state", None) != instance.scoring_state:
+        schedule_related_refresh([instance.pk])
+    instance._loaded_scoring_state = instance.scoring_state
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def rescore_product_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            schedule_related_refresh([instance.pk])
+    elif action == "post_clear":
+        schedule_related_refresh(_affected_product_ids(instance))
+    elif action in ("post_add", "post_remove"):
+        schedule_related_refresh(pk_set or [])
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Category)
+def rescore_orphaned_products(sender, instance, **kwargs):
+    schedule_related_refresh(_affected_product_ids(instance))
+
+
+# ---------------------------
+# FACETS
+# ---------------------------
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def invalidate_facets(sender, **kwargs):
+    bump_version(FACETS_VERSION)
+
+
+# ---------------------------
+# RESERVATION COUNTERS
+# ---------------------------
+@receiver(post_save, sender=ProductVariantReservation)
+def count_reservation(sender, instance, created, **kwargs):
+    if created:
+        ProductVariant.objects.filter(id=instance.variant_id).update(
+            reserved_quantity=F("reserved_quantity") + instance.quantity
+        )
+
+
+@receiver(post_delete, sender=ProductVariantReservation)
+def uncount_reservation(sender, instance, **kwargs):
+    ProductVariant.objects.filter(id=instance.variant_id).update(
+        reserved_quantity=Greatest(F("reserved_quantity") - instance.quantity, 0)
+    )
+
+
+# ---------------------------
+# SIZE AVAILABILITY
+# ---------------------------
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def refresh_variant_size_mask(sender, instance, **kwargs):
+    refresh_size_masks([instance.product_id])
+
+
+@receiver(post_save, sender=ProductVariantReservation)
+@receiver(post_delete, sender=ProductVariantReservation)
+def refresh_reserved_size_mask(sender, instance, **kwargs):
+    refresh_size_masks(
+        ProductVariant.objects.filter(id=instance.variant_id).values_list("product_id", flat=True)
+    )
+
+
+# ---------------------------
+# PRODUCT PAGE FRAGMENTS
+# ---------------------------
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_page(sender, instance, **kwargs):
+    bump_product_versions([instance.pk])
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_product_page_parts(sender, instance, **kwargs):
+    bump_product_versions([instance.product_id])
+
+
+@receiver(post_save, sender=ProductVariantReservation)
+@receiver(post_delete, sender=ProductVariantReservation)
+def invalidate_reserved_product_page(sender, instance, **kwargs):
+    bump_product_sizes_versions(
+        ProductVariant.objects.filter(id=instance.variant_id).values_list("product_id", flat=True)
+    )
+
+
+# related-product cards show other products' names, prices and images
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_related_cards(sender, **kwargs):
+    bump_version(RELATED_VERSION)
+
+
+# ---------------------------
+# REFERENCE DATA
+# ---------------------------
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_reference_lists(sender, **kwargs):
+    invalidate_reference_data()
+
+
+# ---------------------------
+# DISCOUNT TIMELINE
+# ---------------------------
+@receiver(post_save, sender=Product)
+def reschedule_discount(sender, instance, created, **kwargs):
+    if created or getattr(instance, "_loaded_discount_state", None) != instance.discount_state:
+        schedule_discounts([instance.pk])
+    instance._loaded_discount_state = instance.discount_state
+
+
+# ---------------------------
+# STORED FILES
+# ---------------------------
+@receiver(post_save, sender=ProductImage)
+def queue_replaced_image_files(sender, instance, **kwargs):
+    loaded = getattr(instance, "_loaded_file_names", set())
+    queue_deletions(loaded - instance.file_names)
+    instance._loaded_file_names = instance.file_names
+
+
+@receiver(post_delete, sender=ProductImage)
+def queue_deleted_image_files(sender, instance, **kwargs):
+    queue_deletions(instance.file_names)
+    # deleted before the worker got to it
+    queue_deletions([instance.staged_name], staged=True)
+
+
+# ---------------------------
+# IMAGE PROCESSING
+# ---------------------------
+@receiver(post_save, sender=ProductImage)
+def process_replaced_image(sender, instance, **kwargs):
+    if instance.__dict__.pop("_needs_renditions", False):
+        schedule_processing([instance.pk])
+
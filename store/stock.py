@@ -0,0 +1,105 @@
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from .cache import bump_product_sizes_versions, bump_version
+from .facets import FACETS_VERSION
+from .models import ProductVariant, refresh_size_masks
+
+StockCommit = namedtuple("StockCommit", ["committed", "short"])
+
+
+def order_lines(items):
+    # cart or order items -> {variant_id: quantity}
+    lines = defaultdict(int)
+    for item in items:
+        lines[item.variant_id] += item.quantity
+    return dict(lines)
+
+
+def lock_available(variant_ids, owner=None):
+    from .reservations import get_reservation_backend
+
+    variant_ids = sorted(set(variant_ids))
+    # id order, so concurrent commits take the locks in the same sequence
+    list(
+        ProductVariant.objects.select_for_update()
+        .filter(id__in=variant_ids)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    # read under the locks and through the configured backend, so holds kept
+    # outside the database count too; owner's own holds are theirs to use
+    return get_reservation_backend().available_for(variant_ids, owner=owner)
+
+
+def _decrement(committed):
+    if not committed:
+        return
+    ProductVariant.objects.filter(id__in=committed).update(
+        stock=Case(
+            *[
+                When(id=variant_id, stock__gte=quantity, then=F("stock") - Value(quantity))
+                for variant_id, quantity in committed.items()
+            ],
+            default=F("stock"),
+            output_field=PositiveIntegerField(),
+        )
+    )
+    product_ids = set(
+        ProductVariant.objects.filter(id__in=committed).values_list("product_id", flat=True)
+    )
+    refresh_size_masks(product_ids)
+    bump_product_sizes_versions(product_ids)
+    transaction.on_commit(lambda: bump_version(FACETS_VERSION))
+
+
+def commit_stock(lines, partial=False, owner=None):
+    # Takes {variant_id: quantity} off stock. short maps every line that didn't
+    # fit to what was available; unless partial, one short line commits nothing.
+    lines = {variant_id: quantity for variant_id, quantity in lines.items() if quantity > 0}
+    if not lines:
+        return StockCommit({}, {})
+
+    with transaction.atomic():
+        available = lock_available(lines, owner)
+        short = {
+            variant_id: max(available.get(variant_id, 0), 0)
+            for variant_id, quantity in lines.items()
+            if available.get(variant_id, 0) < quantity
+        }
+        if short and not partial:
+            return StockCommit({}, short)
+
+        committed = {variant_id: quantity for variant_id, quantity in lines.items() if variant_id not in short}
+        _decrement(committed)
+
+    return StockCommit(committed, short)
+
+
+def commit_stock_batches(batches):
+    # {key: lines}, each committed whole or not at all, first come first served,
+    # under one lock on every variant involved. Returns (committed keys,
+    # {key: short lines with what was left when its turn came}).
+    with transaction.atomic():
+        available = lock_available({variant_id for lines in batches.values() for variant_id in lines})
+        taken = defaultdict(int)
+        committed, short = [], {}
+
+        for key, lines in batches.items():
+            missing = {
+                variant_id: max(available.get(variant_id, 0) - taken[variant_id], 0)
+                for variant_id, quantity in lines.items()
+                if available.get(variant_id, 0) - taken[variant_id] < quantity
+            }
+            if missing:
+                short[key] = missing
+                continue
+            for variant_id, quantity in lines.items():
+                taken[variant_id] += quantity
+            committed.append(key)
+
+        _decrement({variant_id: quantity for variant_id, quantity in taken.items() if quantity > 0})
+
+    return committed, short
@@ -0,0 +1,127 @@
+import logging
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .images import staging_storage
+from .models import ProductImage, StorageDeletion, product_image_path
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+RETRY_DELAY = timedelta(minutes=1)     # doubled after every failed attempt
+ORPHAN_MIN_AGE = timedelta(hours=1)
+
+logger = logging.getLogger(__name__)
+
+
+def queue_deletions(names, staged=False):
+    # Called inside the transaction that drops the references, so a rollback
+    # keeps the files; nothing touches the storage until the queue is drained.
+    names = sorted({name for name in names if name})
+    StorageDeletion.objects.bulk_create([StorageDeletion(name=name, staged=staged) for name in names])
+    return names
+
+
+# ---------------------------
+# DRAINING
+# ---------------------------
+def drain_deletions(batch_size=BATCH_SIZE, storage=None):
+    # Rows are claimed with SKIP LOCKED, so concurrent workers split the queue.
+    # A failed delete is pushed back with a growing delay until it runs out of
+    # attempts; those rows stay in the table for a look in the admin.
+    storage = storage or default_storage
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                StorageDeletion.objects.select_for_update(skip_locked=True)
+                .filter(attempts__lt=MAX_ATTEMPTS, next_attempt_at__lte=timezone.now())
+                .order_by("next_attempt_at", "id")[:batch_size]
+            )
+            if not rows:
+                break
+
+            # a name an image points at again (e.g. re-uploaded) must survive
+            names = [row.name for row in rows]
+            in_use = {
+                False: set(ProductImage.objects.filter(image__in=names).values_list("image", flat=True)),
+                True: set(ProductImage.objects.filter(staged_name__in=names).values_list("staged_name", flat=True)),
+            }
+            done, failed = [], []
+            for row in rows:
+                try:
+                    if row.name not in in_use[row.staged]:
+                        (staging_storage if row.staged else storage).delete(row.name)
+                except Exception as exc:
+                    logger.warning("Deleting %s from storage failed: %r", row.name, exc)
+                    row.attempts += 1
+                    row.last_error = repr(exc)
+                    row.next_attempt_at = timezone.now() + RETRY_DELAY * 2 ** (row.attempts - 1)
+                    failed.append(row)
+                else:
+                    done.append(row.id)
+
+            StorageDeletion.objects.filter(id__in=done).delete()
+            StorageDeletion.objects.bulk_update(failed, ["attempts", "last_error", "next_attempt_at"])
+            deleted += len(done)
+
+        if len(rows) < batch_size:
+            break
+
+    if deleted:
+        logger.info("Deleted %s stored file(s)", deleted)
+    return deleted
+
+
+# ---------------------------
+# ORPHANS
+# ---------------------------
+def stored_names(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from stored_names(storage, posixpath.join(path, directory))
+
+
+def _referenced_names():
+    referenced, busy = set(), set()
+    images = ProductImage.objects.select_related("product").only(
+        "image", "renditions", "staged_name", "order", "product__name"
+    )
+    for image in images.iterator():
+        referenced |= image.file_names
+        if image.staged_name:
+            # the worker may have uploaded the original without saving the row yet
+            busy.add(posixpath.dirname(product_image_path(image, image.staged_name)))
+    return referenced, busy
+
+
+def find_orphans(prefix="products", min_age=ORPHAN_MIN_AGE, storage=None):
+    # files under prefix that no image row and no queued deletion refers to
+    storage = storage or default_storage
+    # listed before the references are read, so anything saved in between counts as referenced
+    names = list(stored_names(storage, prefix))
+    referenced, busy = _referenced_names()
+    referenced |= set(StorageDeletion.objects.values_list("name", flat=True))
+
+    cutoff = timezone.now() - min_age
+    orphans = []
+    for name in names:
+        if name in referenced or posixpath.dirname(name) in busy:
+            continue
+        try:
+            if storage.get_modified_time(name) > cutoff:
+                continue
+        except NotImplementedError:
+            pass
+        orphans.append(name)
+    return orphans
+
+
+def reconcile_orphans(prefix="products", min_age=ORPHAN_MIN_AGE, storage=None):
+    with transaction.atomic():
+        return queue_deletions(find_orphans(prefix, min_age, storage))
@@ -0,0 +1,204 @@
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from django.urls import reverse
+
+from .cache import version_seed
+from .search import tokenize
+
+VERSION_KEY = "store:suggestions:version"
+CHANGES_KEY = "store:suggestions:changes:{}"
+CHANGES_TIMEOUT = 60 * 60
+MAX_INCREMENTAL_STEPS = 50
+MAX_TOKENS_PER_PRODUCT = 24
+
+NAME_WEIGHT = 3
+TAG_WEIGHT = 1
+
+
+def mark_products_changed(product_ids):
+    # Every worker keeps its own index; the shared cache tells them what to refresh.
+    # After commit, so a worker syncing meanwhile can't index pre-commit rows under the new version.
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+
+    def publish():
+        cache.add(VERSION_KEY, version_seed(), timeout=None)
+        version = cache.incr(VERSION_KEY)
+        cache.set(CHANGES_KEY.format(version), product_ids, CHANGES_TIMEOUT)
+
+    transaction.on_commit(publish)
+
+
+def _current_version():
+    return cache.get(VERSION_KEY, 0)
+
+
+class SuggestionIndex:
+    def __init__(self, max_products=None):
+        self.max_products = max_products
+        self.version = None
+        self._lock = threading.Lock()
+        self._keys = []        # sorted (token, product_id, weight)
+        self._entries = {}     # product_id -> (keys, payload, pricing)
+
+    # ---------------------------
+    # BUILDING
+    # ---------------------------
+    def _limit(self):
+        return self.max_products or getattr(settings, "SUGGESTION_INDEX_MAX_PRODUCTS", 5000)
+
+    def _load(self, product_ids=None):
+        from .models import Product, ProductImage
+
+        qs = (
+            Product.objects.filter(status="active")
+            .only("id", "name", "price", "discount_percent", "is_discounted")
+            .prefetch_related(
+                "tags",
+                Prefetch("images", queryset=ProductImage.objects.ready().order_by("order")),
+            )
+            .order_by("-id")
+        )
+        if product_ids is not None:
+            qs = qs.filter(id__in=product_ids)
+        return list(qs[:self._limit()])
+
+    def _entry(self, product):
+        weights = {}
+        for token in tokenize(product.name):
+            weights[token] = NAME_WEIGHT
+        for tag in product.tags.all():
+            for token in tokenize(tag.name):
+                weights.setdefault(token, TAG_WEIGHT)
+
+        keys = [
+            (token, product.id, weight)
+            for token, weight in list(weights.items())[:MAX_TOKENS_PER_PRODUCT]
+        ]
+        images = product.images.all()
+        payload = {
+            "id": product.id,
+            "name": product.name,
+            "url": reverse("product", args=[product.id]),
+            "image": images[0].thumb_url if images else "",
+        }
+        # enough for final_price without keeping the loaded instance around
+        pricing = product.__class__(
+            price=product.price,
+            discount_percent=product.discount_percent,
+            is_discounted=product.is_discounted,
+        )
+        return keys, payload, pricing
+
+    def _remove(self, product_id):
+        entry = self._entries.pop(product_id, None)
+        if not entry:
+            return
+        for key in entry[0]:
+            pos = bisect_left(self._keys, key)
+            if pos < len(self._keys) and self._keys[pos] == key:
+                del self._keys[pos]
+
+    def _add(self, product):
+        entry = self._entry(product)
+        self._entries[product.id] = entry
+        for key in entry[0]:
+            insort(self._keys, key)
+
+    def _evict_overflow(self):
+        overflow = len(self._entries) - self._limit()
+        if overflow > 0:
+            for product_id in sorted(self._entries)[:overflow]:
+                self._remove(product_id)
+
+    def rebuild(self, version=None):
+        products = self._load()
+        entries = {p.id: self._entry(p) for p in products}
+        keys = sorted(key for entry in entries.values() for key in entry[0])
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self.version = _current_version() if version is None else version
+
+    def refresh(self, product_ids, version=None):
+        product_ids = set(product_ids)
+        products = self._load(product_ids)
+        with self._lock:
+            for product_id in product_ids:
+                self._remove(product_id)
+            for product in products:
+                self._add(product)
+            self._evict_overflow()
+            if version is not None:
+                self.version = version
+
+    def sync(self):
+        current = _current_version()
+        if self.version == current:
+            return
+
+        if self.version is None or current - self.version > MAX_INCREMENTAL_STEPS or current < self.version:
+            self.rebuild(current)
+            return
+
+        changed = set()
+        for version in range(self.version + 1, current + 1):
+            ids = cache.get(CHANGES_KEY.format(version))
+            if ids is None:
+                self.rebuild(current)
+                return
+            changed.update(ids)
+        self.refresh(changed, current)
+
+    # ---------------------------
+    # LOOKUP
+    # ---------------------------
+    def _matches(self, prefix):
+        hits = {}
+        pos = bisect_left(self._keys, (prefix,))
+        while pos < len(self._keys):
+            token, product_id, weight = self._keys[pos]
+            if not token.startswith(prefix):
+                break
+            bonus = 1 if token == prefix else 0
+            hits[product_id] = max(hits.get(product_id, 0), weight + bonus)
+            pos += 1
+        return hits
+
+    def lookup(self, query, limit=6):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            scores = None
+            for token in tokens:
+                hits = self._matches(token)
+                if scores is None:
+                    scores = hits
+                else:
+                    scores = {pid: s + hits[pid] for pid, s in scores.items() if pid in hits}
+                if not scores:
+                    return []
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+            entries = [self._entries[pid] for pid, _ in ranked]
+
+        return [
+            {**payload, "price": str(pricing.final_price)}
+            for _, payload, pricing in entries
+        ]
+
+
+suggestion_index = SuggestionIndex()
+
+
+def get_suggestions(query, limit=6):
+    suggestion_index.sync()
+    return suggestion_index.lookup(query, limit)
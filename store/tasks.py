@@ -1,8 +1,27 @@
 from celery import shared_task
-from django.utils import timezone
-from .models import ProductVariantReservation
+from .reservations import get_reservation_backend
+from .recommendations import refresh_related_products
+from .discounts import apply_due_transitions
+from .images import process_image
+from .storage_cleanup import drain_deletions
 
 @shared_task
 def release_expired_reservations():
-    now = timezone.now()
-    ProductVariantReservation.objects.filter(reserved_until__lte=now).delete()
\ No newline at end of file
+    return get_reservation_backend().expire()
+
+@shared_task
+def refresh_related_products_task(product_ids=None):
+    return refresh_related_products(product_ids)
+
+@shared_task
+def apply_discount_transitions():
+    return apply_due_transitions()
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, max_retries=5)
+def process_product_image(image_id):
+    return process_image(image_id)
+
+@shared_task
+def drain_storage_deletions():
+    return drain_deletions()
+
@@ -1,3 +1,222 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+
+from .imports import import_products
+from .models import Category, Product, ProductVariant, ProductVariantReservation, Tag
+from .pagination import CursorPaginator, encode_cursor
+from .reservations import DatabaseReservationBackend, InMemoryReservationBackend, load_availability
+from .stock import commit_stock, commit_stock_batches
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_variant(stock, size="M", name="Tee"):
+    product = Product.objects.create(
+        name=name, slug=f"{name.lower()}-{Product.objects.count()}", price="20.00", status="active"
+    )
+    return ProductVariant.objects.create(product=product, size=size, stock=stock)
+
+
+class InMemoryReservationBackendTests(TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.backend = InMemoryReservationBackend(clock=self.clock)
+        patcher = mock.patch("store.reservations._backend", self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.variant = make_variant(stock=2)
+
+    def test_hold_blocks_other_owners(self):
+        self.assertTrue(self.backend.reserve("session:a", {self.variant.id: 2}))
+        self.assertFalse(self.backend.reserve("session:b", {self.variant.id: 1}))
+        self.assertEqual(self.backend.available_for([self.variant.id]), {self.variant.id: 0})
+        self.assertEqual(self.backend.available_for([self.variant.id], owner="session:a"), {self.variant.id: 2})
+
+    def test_reserve_is_all_or_nothing(self):
+        sold_out = make_variant(stock=0, size="L")
+        self.assertFalse(self.backend.reserve("session:a", {self.variant.id: 1, sold_out.id: 1}))
+        self.assertEqual(self.backend.available_for([self.variant.id]), {self.variant.id: 2})
+
+    def test_release_frees_stock(self):
+        self.backend.reserve("session:a", {self.variant.id: 2})
+        self.backend.release("session:a")
+        self.assertEqual(self.backend.available_for([self.variant.id]), {self.variant.id: 2})
+        self.assertTrue(self.backend.reserve("session:b", {self.variant.id: 2}))
+
+    def test_confirm_takes_covered_lines_and_releases_after_commit(self):
+        other = make_variant(stock=3, size="S")
+        self.backend.reserve("session:a", {self.variant.id: 2})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            committed = self.backend.confirm("session:a", {self.variant.id: 2, other.id: 1})
+
+        self.assertEqual(committed, {self.variant.id: 2})
+        self.variant.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.variant.stock, other.stock), (0, 3))
+        self.assertEqual(self.backend._held_variants("session:a"), [])
+
+    def test_lapsed_hold_is_not_confirmed(self):
+        self.backend.reserve("session:a", {self.variant.id: 1}, ttl=60)
+        self.clock.now += 61
+
+        self.assertEqual(self.backend.confirm("session:a", {self.variant.id: 1}), {})
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 2)
+
+    def test_expire_gives_lapsed_stock_back_to_size_mask(self):
+        product = self.variant.product
+        self.backend.reserve("session:a", {self.variant.id: 2}, ttl=60)
+        product.refresh_from_db()
+        self.assertEqual(product.size_mask, 0)
+
+        self.clock.now += 61
+        self.assertEqual(self.backend.expire(), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.size_mask, ProductVariant.SIZE_BITS["M"])
+
+    def test_availability_reads_count_backend_holds(self):
+        self.backend.reserve("session:a", {self.variant.id: 2})
+
+        self.assertEqual(ProductVariant.objects.get(pk=self.variant.pk).available_quantity(), 0)
+        variant, = load_availability(ProductVariant.objects.filter(pk=self.variant.pk))
+        self.assertEqual(variant.available, 0)
+
+    def test_commit_stock_respects_holds_of_others(self):
+        self.backend.reserve("session:a", {self.variant.id: 2})
+
+        result = commit_stock({self.variant.id: 1})
+        self.assertEqual(result.short, {self.variant.id: 0})
+        result = commit_stock({self.variant.id: 1}, owner="session:a")
+        self.assertEqual(result.committed, {self.variant.id: 1})
+
+
+class CursorPaginatorTests(TestCase):
+    def test_cursor_from_another_ordering_starts_over(self):
+        for i in range(3):
+            make_variant(stock=1, name=f"Tee{i}")
+        by_name = CursorPaginator(Product.objects.order_by("name"), 2).get_page()
+        by_price = CursorPaginator(Product.objects.order_by("current_price"), 2)
+
+        page = by_price.get_page(by_name.next_cursor)
+        self.assertEqual(len(page), 2)
+        self.assertFalse(page.has_previous())
+
+        page = by_price.get_page(encode_cursor([None, "x"], "prev"))
+        self.assertEqual(len(page), 2)
+
+
+class ReservationExpiryTests(TestCase):
+    def test_expire_sweeps_in_chunks_and_settles_counters(self):
+        variants = [make_variant(stock=1000, size=size) for size in ("S", "M")]
+        past = timezone.now() - timedelta(minutes=1)
+        ProductVariantReservation.objects.bulk_create(
+            ProductVariantReservation(variant=variants[i % 2], session_key=f"s{i}", quantity=1, reserved_until=past)
+            for i in range(802)
+        )
+        live = ProductVariantReservation.objects.create(
+            variant=variants[0], session_key="live", quantity=3, reserved_until=timezone.now() + timedelta(minutes=5)
+        )
+        ProductVariant.objects.filter(pk=variants[0].pk).update(reserved_quantity=401 + 3)
+        ProductVariant.objects.filter(pk=variants[1].pk).update(reserved_quantity=401)
+
+        with self.assertLogs("store.reservations", "INFO") as logs:
+            expired = DatabaseReservationBackend().expire(batch_size=500, pause=0)
+
+        self.assertEqual(expired, 802)
+        self.assertIn("in 2 batches", logs.output[0])
+        self.assertEqual(list(ProductVariantReservation.objects.values_list("id", flat=True)), [live.id])
+        counters = ProductVariant.objects.filter(pk__in=[v.pk for v in variants]).values_list("reserved_quantity", flat=True)
+        self.assertEqual(sorted(counters), [0, 3])
+
+
+class CommitStockTests(TestCase):
+    def setUp(self):
+        self.plenty = make_variant(stock=5, size="S")
+        self.scarce = make_variant(stock=2, size="M")
+
+    def stock(self):
+        return tuple(ProductVariant.objects.get(pk=v.pk).stock for v in (self.plenty, self.scarce))
+
+    def test_one_short_line_commits_nothing(self):
+        result = commit_stock({self.plenty.id: 1, self.scarce.id: 3})
+
+        self.assertEqual(result.committed, {})
+        self.assertEqual(result.short, {self.scarce.id: 2})
+        self.assertEqual(self.stock(), (5, 2))
+
+    def test_partial_commit_takes_what_fits(self):
+        result = commit_stock({self.plenty.id: 1, self.scarce.id: 3}, partial=True)
+
+        self.assertEqual(result.committed, {self.plenty.id: 1})
+        self.assertEqual(self.stock(), (4, 2))
+
+    def test_holds_count_except_for_their_owner(self):
+        DatabaseReservationBackend().reserve("session:a", {self.scarce.id: 2})
+
+        self.assertEqual(commit_stock({self.scarce.id: 1}).short, {self.scarce.id: 0})
+        self.assertEqual(commit_stock({self.scarce.id: 2}, owner="session:a").committed, {self.scarce.id: 2})
+        self.assertEqual(self.stock(), (5, 0))
+
+    def test_batches_are_served_in_order(self):
+        committed, short = commit_stock_batches({
+            "first": {self.scarce.id: 2},
+            "second": {self.scarce.id: 1, self.plenty.id: 1},
+            "third": {self.plenty.id: 2},
+        })
+
+        self.assertEqual(committed, ["first", "third"])
+        self.assertEqual(short, {"second": {self.scarce.id: 0}})
+        self.assertEqual(self.stock(), (3, 0))
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        Category.objects.create(name="Tees", slug="tees")
+        make_variant(stock=1, name="Taken")
+
+    def test_bad_csv_rows_are_reported_by_line(self):
+        data = (
+            "name,slug,price,category,tags,stock_M\n"
+            "Good Tee,good-tee,25.00,tees,Summer|Cotton,4\n"
+            "Cheap Tee,cheap-tee,-1,tees,,\n"
+            "Lost Tee,lost-tee,10.00,nowhere,,\n"
+            "Taken Tee,taken-0,10.00,,,\n"
+            "Twin Tee,good-tee,10.00,,,\n"
+        )
+        report = import_products(io.StringIO(data), "csv")
+
+        product = Product.objects.get(slug="good-tee")
+        self.assertEqual(report.created, [product.id])
+        self.assertEqual([number for number, _ in report.errors], [3, 4, 5, 6])
+        self.assertTrue(report.errors[0][1].startswith("price:"))
+        self.assertIn("unknown category", report.errors[1][1])
+        self.assertIn("already exists", report.errors[2][1])
+        self.assertIn("already exists", report.errors[3][1])
+
+        self.assertEqual(product.variants.count(), len(ProductVariant.SIZE_CHOICES))
+        self.assertEqual(product.variants.get(size="M").stock, 4)
+        self.assertEqual(sorted(product.tags.values_list("name", flat=True)), ["Cotton", "Summer"])
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_bad_json_lines_are_skipped(self):
+        data = (
+            '{"name": "Json Tee", "price": "15", "stock": {"S": 2}}\n'
+            "{not json\n"
+            '["a list"]\n'
+        )
+        report = import_products(io.StringIO(data), "jsonl")
 
-# Create your tests here.
+        self.assertEqual(len(report.created), 1)
+        self.assertEqual([number for number, _ in report.errors], [2, 3])
+        self.assertEqual(Product.objects.get(slug="json-tee").variants.get(size="S").stock, 2)
@@ -13,6 +13,8 @@ urlpatterns = [
     path('returns', views.returns, name='returns'),
     path("add-products/", views.add_product, name="add_product"),
     path("drafts/", views.draft_products, name="draft_products"),
+    path("products/export/", views.export_products, name="export_products"),
+    path("products/import/", views.import_products, name="import_products"),
     path("product/<int:id>/add-draft/", views.add_to_draft, name="add_to_draft"),
     path("product/<int:id>/edit/", views.edit_product, name="edit_product"),
     path("product/search/", views.related_products_search, name="related_products_search"),
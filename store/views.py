@@ -1,18 +1,35 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Category, Product, ProductImage, ProductVariant, Tag
+from django.http import Http404
+from .models import Category, Product, ProductImage, ProductVariant
 from django.views.decorators.http import require_POST
 from django.http import JsonResponse
-from django.db.models import Q
 from django.contrib.admin.views.decorators import staff_member_required
 from django.db import transaction 
 from orders.forms import AddToCartForm
+from orders.cart import refresh_cart_count
 from orders.views import get_or_create_cart
 from orders.models import CartItem
 from django.core.paginator import Paginator
+from .pagination import CursorPaginator
 from django.db.models import Prefetch
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 import json
 from django.contrib import messages
 from .forms import DiscountForm
+from .search import search_products
+from .suggestions import get_suggestions, mark_products_changed
+from .recommendations import schedule_related_refresh
+from .cache import (
+    RELATED_VERSION, bump_product_versions, bump_version, get_product_sizes_version, get_product_version, get_version,
+)
+from .facets import FACETS_VERSION, get_facets
+from .discounts import invalidate_discounted_products, schedule_discounts
+from .reference import get_categories, get_category_by_slug, get_tags
+from .exports import FORMATS, product_export, streaming_export
+from .imports import import_uploaded_file
+from .images import stage_images
+from .reservations import load_availability
 
 SIZES = ["XS", "S", "M", "L", "XL", "2XL"]
 
@@ -21,16 +38,13 @@ def apply_filters(request, products):
     max_price = request.GET.get("max_price")
 
     if min_price:
-        products = products.filter(price__gte=min_price)
+        products = products.filter(current_price__gte=min_price)
     if max_price:
-        products = products.filter(price__lte=max_price)
+        products = products.filter(current_price__lte=max_price)
 
     sizes = request.GET.getlist("size")
     if sizes:
-        products = products.filter(
-            variants__size__in=sizes,
-            variants__stock__gt=0
-        ).distinct()
+        products = products.with_sizes_available(sizes)
 
     selected_sizes = sizes
 
@@ -40,13 +54,17 @@ def apply_filters(request, products):
 
     discount = request.GET.get("discount")
     if discount:
-        products = products.filter(discount_percent__gte=discount)
+        products = products.filter(is_discounted=True, discount_percent__gte=discount)
+
+    min_rating = request.GET.get("min_rating")
+    if min_rating in ("1", "2", "3", "4"):
+        products = products.filter(rating_average__gte=min_rating)
 
     sort = request.GET.get("sort")
     if sort == "price_asc":
-        products = products.order_by("price")
+        products = products.order_by("current_price")
     elif sort == "price_desc":
-        products = products.order_by("-price")
+        products = products.order_by("-current_price")
     elif sort == "az":
         products = products.order_by("name")
     elif sort == "za":
@@ -55,12 +73,14 @@ def apply_filters(request, products):
         products = products.order_by("-created_at")
     elif sort == "oldest":
         products = products.order_by("created_at")
+    elif sort == "rating":
+        products = products.order_by("-rating_average", "-rating_count")
 
     return products, selected_sizes
 
 
 def home(request):
-    categories = Category.objects.all()
+    categories = get_categories()
     return render(request, 'store/home.html', {'categories': categories})
 
 
@@ -69,7 +89,7 @@ def returns(request):
 
 def collection(request, slug=None, filter_type=None):
     category = None
-    products = Product.objects.filter(status="active")
+    products = Product.objects.for_listing().filter(status="active")
 
     if filter_type == "new":
         products = products.order_by("-created_at")
@@ -77,12 +97,14 @@ def collection(request, slug=None, filter_type=None):
         title = "New"
 
     elif filter_type == "sale":
-        products = products.filter(discount_percent__gt=0)
+        products = products.on_sale()
         active_filter = "sale"
         title = "Sale"
 
     elif slug:
-        category = get_object_or_404(Category, slug=slug)
+        category = get_category_by_slug(slug)
+        if category is None:
+            raise Http404("No Category matches the given query.")
         products = products.filter(category=category)
         active_filter = "category"
         title = category.name
@@ -90,13 +112,12 @@ def collection(request, slug=None, filter_type=None):
         active_filter = "category"
         title = "All"
 
+    facets = get_facets(products, request.GET, SIZES, [filter_type, slug])
     products, selected_sizes = apply_filters(request, products)
 
-    paginator = Paginator(products, 42)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = CursorPaginator(products, 42).get_page(request.GET.get("cursor"))
 
-    categories = Category.objects.all()
+    categories = get_categories()
 
     return render(request, "store/collection.html", {
         "category": category,
@@ -106,34 +127,32 @@ def collection(request, slug=None, filter_type=None):
         "categories": categories,
         "active_filter": active_filter,
         "selected_sizes": selected_sizes,
-        "sizes": SIZES
+        "sizes": SIZES,
+        "facets": facets,
     })
 
 def search(request):
     q = request.GET.get("q", "").strip()
 
-    base_qs = Product.objects.filter(status="active")
+    base_qs = Product.objects.for_listing().filter(status="active")
 
     if q:
-        base_qs = base_qs.filter(
-            Q(name__icontains=q) |
-            Q(tags__name__icontains=q)
-        ).distinct()
+        base_qs = search_products(base_qs, q)
     else:
-        base_qs = Product.objects.none()
+        base_qs = base_qs.none()
 
+    facets = get_facets(base_qs, request.GET, SIZES, ["search", q]) if q else None
     products, selected_sizes = apply_filters(request, base_qs)
 
-    paginator = Paginator(products, 42)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = CursorPaginator(products, 42).get_page(request.GET.get("cursor"))
 
     return render(request, "store/collection.html", {
         "products": page_obj,
         "page_obj": page_obj,
-        "categories": Category.objects.all(),
+        "categories": get_categories(),
         "selected_sizes": selected_sizes,
         "sizes": SIZES,
+        "facets": facets,
         "title": f"Search: {q}",
         "active_filter": "search",
         "query": q,
@@ -168,21 +187,26 @@ def product_detail(request, id):
                 if available > 0:
                     item.quantity = 1
                     item.save()
+            refresh_cart_count(cart)
 
             return redirect("cart")
     else:
         form = AddToCartForm(product=product)
 
     # --- Reviews ---
+    page_number = request.GET.get("page", "1")
+    if not page_number.isdigit():
+        page_number = "1"
     reviews_qs = product.reviews.select_related("user").order_by("-created_at")
-    paginator = Paginator(reviews_qs, 10)
-    page_number = request.GET.get("page", 1)
-    reviews_page = paginator.get_page(page_number)
+    # only evaluated when the fragment that shows them isn't cached
+    reviews_page = SimpleLazyObject(lambda: Paginator(reviews_qs, 10).get_page(page_number))
 
     user_review = None
     if request.user.is_authenticated:
         user_review = product.reviews.filter(user=request.user).first()
-    related_products = product.get_related_products(limit=15)
+    related_products = SimpleLazyObject(lambda: product.get_related_products(limit=15))
+    variants = SimpleLazyObject(lambda: load_availability(product.variants.all()))
+
     return render(
         request,
         "store/product.html",
@@ -190,44 +214,32 @@ def product_detail(request, id):
             "product": product,
             "form": form,
             "reviews_page": reviews_page,
+            "reviews_page_number": page_number,
+            # edit forms carry a CSRF token, so review lists showing them aren't shared
+            "cache_reviews": not (user_review or request.user.is_staff or request.user.is_superuser),
             "user_review": user_review,
             "related_products": related_products,
+            "variants": variants,
+            "fragment_version": get_product_version(product.id),
+            "sizes_version": get_product_sizes_version(product.id),
+            "related_version": get_version(RELATED_VERSION),
+            "fragment_timeout": getattr(settings, "PRODUCT_FRAGMENT_TIMEOUT", 600),
         },
     )
 
+
 def search_suggestions(request):
     q = request.GET.get("q", "").strip()
 
     if len(q) < 2:
         return JsonResponse([], safe=False)
 
-    products = (
-        Product.objects.filter(
-            Q(name__icontains=q) |
-            Q(tags__name__icontains=q),
-            status="active",
-        )
-        .prefetch_related("images")
-        .distinct()[:6]
-    )
-
-    data = []
-    for p in products:
-        image = p.images.first()
-        data.append({
-            "id": p.id,
-            "name": p.name,
-            "url": f"/product/{p.id}/",
-            "image": image.image.url if image else "",
-            "price": str(p.final_price),
-        })
-
-    return JsonResponse(data, safe=False)
+    return JsonResponse(get_suggestions(q), safe=False)
 
 @staff_member_required
 def add_product(request):
-    categories = Category.objects.all()
-    tags = Tag.objects.all()
+    categories = get_categories()
+    tags = get_tags()
 
     if request.method == "POST":
         name = request.POST.get("name")
@@ -272,13 +284,8 @@ def add_product(request):
                 )
 
             files = request.FILES.getlist("images")
-
-            for i, image in enumerate(files):
-                ProductImage.objects.create(
-                    product=product,
-                    image=image,
-                    order=i
-                )
+            # resized and uploaded by the worker, see store.images
+            stage_images(product, [(image, i) for i, image in enumerate(files)])
 
         return redirect("draft_products")
 
@@ -303,7 +310,7 @@ def related_products_search(request):
         qs = qs.filter(name__icontains=q)
 
     qs = qs.prefetch_related(
-        Prefetch("images", queryset=ProductImage.objects.order_by("order"))
+        Prefetch("images", queryset=ProductImage.objects.ready().order_by("order"))
     )
 
     paginator = Paginator(qs, 10)
@@ -313,11 +320,7 @@ def related_products_search(request):
         {
             "id": p.id,
             "name": p.name,
-            "image": (
-                p.images.first().image.url
-                if p.images.exists()
-                else ""
-            ),
+            "image": next((img.thumb_url for img in p.images.all()), ""),
         }
         for p in page_obj.object_list
     ]
@@ -352,16 +355,29 @@ def draft_products(request):
 
         if action == "activate":
             products.update(status="active")
+            mark_products_changed(ids)
+            schedule_related_refresh(ids)
+            bump_version(FACETS_VERSION)
+            bump_product_versions(ids)
 
         elif action == "archive":
             products.update(status="archived")
+            mark_products_changed(ids)
+            schedule_related_refresh(ids)
+            bump_version(FACETS_VERSION)
+            bump_product_versions(ids)
 
         elif action == "delete":
             products.delete()
 
+    drafts_page = CursorPaginator(
+        Product.objects.filter(status="draft").select_related("category"), 50
+    ).get_page(request.GET.get("cursor"))
+
     context = {
         "active_products": Product.objects.filter(status="active"),
-        "drafts": Product.objects.filter(status="draft"),
+        "drafts": drafts_page,
+        "page_obj": drafts_page,
         "archived_products": Product.objects.filter(status="archived"),
     }
 
@@ -454,21 +470,20 @@ def edit_product(request, id):
 
         files = request.FILES.getlist("images")
 
-        for i, file in enumerate(files):
-            order = new_order[i] if i < len(new_order) else i
+        stage_images(product, [
+            (file, new_order[i] if i < len(new_order) else i)
+            for i, file in enumerate(files)
+        ])
 
-            ProductImage.objects.create(
-                product=product,
-                image=file,
-                order=order
-            )
+        # image reordering above goes through update()
+        bump_product_versions([product.id])
 
         return redirect("draft_products")
 
     return render(request, "store/edit_product.html", {
     "product": product,
-    "categories": Category.objects.all(),
-    "tags": Tag.objects.all(),
+    "categories": get_categories(),
+    "tags": get_tags(),
     "sizes": SIZES,
     "selected_tag_ids": selected_tag_ids,
     "selected_related_ids": selected_related_ids,
@@ -489,17 +504,13 @@ def product_discount_manage(request):
     # Build the base queryset (search + filter)
     qs = Product.objects.select_related("category").prefetch_related("tags")
 
-    if query:
-        qs = qs.filter(
-            Q(name__icontains=query)
-            | Q(tags__name__icontains=query)
-            | Q(sku__icontains=query)
-        ).distinct()
-
     if category_id:
         qs = qs.filter(category_id=category_id)
 
-    qs = qs.order_by("name")
+    if query:
+        qs = search_products(qs, query)
+    else:
+        qs = qs.order_by("name")
 
     if request.method == "POST":
         product_ids = request.POST.getlist("product_ids")
@@ -513,6 +524,8 @@ def product_discount_manage(request):
             updated = Product.objects.filter(id__in=product_ids).update(
                 discount_percent=0, discount_start=None, discount_end=None
             )
+            schedule_discounts(product_ids)
+            invalidate_discounted_products(product_ids)
             messages.success(request, f"Removed discount from {updated} product(s).")
             return redirect(request.path + querystring)
 
@@ -523,6 +536,8 @@ def product_discount_manage(request):
                 discount_start=form.cleaned_data["discount_start"],
                 discount_end=form.cleaned_data["discount_end"],
             )
+            schedule_discounts(product_ids)
+            invalidate_discounted_products(product_ids)
             messages.success(request, f"Discount applied to {updated} product(s).")
             return redirect(request.path + querystring)
 
@@ -535,9 +550,32 @@ def product_discount_manage(request):
 
     context = {
         "page_obj": page_obj,
-        "categories": Category.objects.all(),
+        "categories": get_categories(),
         "query": query,
         "selected_category": category_id,
         "form": form,
     }
-    return render(request, "store/discount_manage.html", context)
\ No newline at end of file
+    return render(request, "store/discount_manage.html", context)
+
+
+@staff_member_required
+def export_products(request):
+    fmt = request.GET.get("format") if request.GET.get("format") in FORMATS else "csv"
+    return streaming_export(
+        "products", product_export, fmt,
+        status=request.GET.get("status") or None,
+        since=request.GET.get("since"),
+        until=request.GET.get("until"),
+    )
+
+
+@staff_member_required
+def import_products(request):
+    report = None
+    if request.method == "POST" and request.FILES.get("file"):
+        report = import_uploaded_file(request.FILES["file"], request.POST.get("format") or None)
+
+    return render(request, "store/import_products.html", {
+        "report": report,
+        "sizes": SIZES,
+    })